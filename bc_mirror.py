@@ -0,0 +1,131 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+
+# ==========================================
+# LOKALER SPIEGEL DES BC-KATALOGS (SQLite)
+# ==========================================
+# Artikel, Attribute und Attributwerte werden lokal gehalten. Ein Warmstart lädt
+# von der Platte und holt bei BC nur die seit dem letzten Lauf geänderten Zeilen.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    number TEXT,
+    display_name TEXT,
+    last_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS attributes (
+    id TEXT PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS attribute_values (
+    id TEXT PRIMARY KEY,
+    attribute_id TEXT,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+class CatalogMirror:
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok=True)
+        self.path = path
+        # Ein Connector kann aus mehreren Threads schreiben (Bulk-Import), daher Lock statt Thread-Bindung
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    # --- Sync-Status ---
+    def get_state(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+            self.db.commit()
+
+    def mark_full_sync(self, kind):
+        self.set_state(f"{kind}_full_at", utc_now().isoformat())
+
+    def is_stale(self, kind, max_age_hours):
+        """True, wenn noch nie voll synchronisiert wurde oder der letzte Voll-Sync zu alt ist."""
+        last = self.get_state(f"{kind}_full_at")
+        if not last: return True
+        try:
+            return utc_now() - datetime.fromisoformat(last) > timedelta(hours=max_age_hours)
+        except ValueError:
+            return True
+
+    # --- Artikel ---
+    def load_items(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, number, display_name FROM items ORDER BY rowid").fetchall()
+        return [{'id': r[0], 'number': r[1], 'displayName': r[2]} for r in rows]
+
+    def max_item_number(self, prefix):
+        """Höchste rein numerische Nummer hinter prefix (numerisch, nicht lexikografisch). None, wenn keine."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT MAX(CAST(substr(number, ?) AS INTEGER)) FROM items "
+                "WHERE substr(number, 1, ?) = ? AND length(number) > ? AND substr(number, ?) NOT GLOB '*[^0-9]*'",
+                (len(prefix) + 1, len(prefix), prefix, len(prefix), len(prefix) + 1)).fetchone()
+        return row[0]
+
+    def upsert_items(self, items, replace=False):
+        rows = [(i.get('id'), i.get('number'), i.get('displayName'), i.get('lastModifiedDateTime')) for i in items if i.get('id')]
+        with self.lock:
+            if replace: self.db.execute("DELETE FROM items")
+            self.db.executemany(
+                "INSERT INTO items (id, number, display_name, last_modified) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET number = excluded.number, display_name = excluded.display_name, "
+                "last_modified = COALESCE(excluded.last_modified, items.last_modified)", rows)
+            self.db.commit()
+
+    # --- Attribute & Werte ---
+    def load_attributes(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, name FROM attributes ORDER BY rowid").fetchall()
+        return [(parse_key(a_id), name) for a_id, name in rows]
+
+    def load_attribute_values(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, attribute_id, value FROM attribute_values ORDER BY rowid").fetchall()
+        return [(parse_key(v_id), parse_key(a_id), value) for v_id, a_id, value in rows]
+
+    def upsert_attributes(self, rows, replace=False):
+        with self.lock:
+            if replace: self.db.execute("DELETE FROM attributes")
+            self.db.executemany("INSERT OR REPLACE INTO attributes (id, name) VALUES (?, ?)",
+                                [(_key(a_id), name) for a_id, name in rows])
+            self.db.commit()
+
+    def upsert_attribute_values(self, rows, replace=False):
+        with self.lock:
+            if replace: self.db.execute("DELETE FROM attribute_values")
+            self.db.executemany("INSERT OR REPLACE INTO attribute_values (id, attribute_id, value) VALUES (?, ?, ?)",
+                                [(_key(v_id), _key(a_id), value) for v_id, a_id, value in rows])
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+def _key(value):
+    # OData liefert IDs je nach Service als Zahl oder GUID; gespeichert wird einheitlich JSON
+    return json.dumps(value)
+
+def parse_key(value):
+    return json.loads(value) if value is not None else None
@@ -0,0 +1,144 @@
+import re
+import time
+import threading
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# HTTP-TRANSPORT FÜR BUSINESS CENTRAL
+# ==========================================
+# Eine gepoolte Session für alle Connector-Aufrufe: Keep-Alive, Standard-Timeouts,
+# Backoff bei 429/503 (mit Retry-After), Token-Refresh bei 401 und Zähler pro Endpunkt.
+
+DEFAULT_TIMEOUT   = (10, 60)      # (Connect, Read) in Sekunden
+MAX_RETRIES       = 5
+BACKOFF_FACTOR    = 1.5
+MAX_BACKOFF       = 60
+RETRY_STATUS      = [429, 502, 503, 504]   # POST/PATCH nur bei 429/503 (dort wurde sicher nichts verarbeitet)
+IDEMPOTENT        = ["GET", "PUT", "DELETE", "HEAD", "OPTIONS"]
+POOL_SIZE         = 32
+BATCH_MAX_REQUESTS = 50            # Requests pro $batch-Aufruf (BC erlaubt max. 100)
+
+def retry_after_seconds(response):
+    """Wartezeit aus dem Retry-After Header (Sekunden oder HTTP-Datum), sonst None."""
+    value = response.headers.get("Retry-After")
+    if not value: return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def endpoint_key(method, url):
+    # IDs und Firmen-Präfix entfernen, damit z.B. alle items(...)/picture Aufrufe zusammen zählen
+    path = requests.utils.urlparse(url).path
+    path = re.sub(r"\([^)]*\)", "()", path)
+    for marker in ("/companies()/", "/Company()/"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    else:
+        path = path.rstrip("/").rsplit("/", 1)[-1]
+    return f"{method} {path}"
+
+class BCTransport:
+    def __init__(self, token_provider, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        """token_provider(force_refresh=False) liefert das aktuelle Bearer-Token."""
+        self.token_provider = token_provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def _count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def _sleep(self, response, attempt):
+        wait = retry_after_seconds(response) if response is not None else None
+        if wait is None: wait = BACKOFF_FACTOR * (2 ** attempt)
+        time.sleep(min(wait, MAX_BACKOFF))
+
+    def request(self, method, url, headers=None, auth=True, **kwargs):
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        headers = dict(headers or {})
+        key = endpoint_key(method, url)
+        token_refreshed = False
+        attempt = 0
+        while True:
+            if auth: headers["Authorization"] = f"Bearer {self.token_provider()}"
+            self._count(key)
+            try:
+                r = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # POST nur wiederholen, wenn sicher nichts beim Server ankam
+                self._count(f"{key} !error")
+                if attempt >= self.max_retries: raise
+                if method not in IDEMPOTENT and not isinstance(e, requests.ConnectTimeout): raise
+                self._sleep(None, attempt)
+                attempt += 1
+                continue
+
+            if r.status_code == 401 and auth and not token_refreshed:
+                self._count(f"{key} !401")
+                self.token_provider(force_refresh=True)
+                token_refreshed = True
+                continue
+            retry_codes = RETRY_STATUS if method in IDEMPOTENT else [429, 503]
+            if r.status_code in retry_codes and attempt < self.max_retries:
+                self._count(f"{key} !{r.status_code}")
+                self._sleep(r, attempt)
+                attempt += 1
+                continue
+            return r
+
+    def get(self, url, **kwargs): return self.request("GET", url, **kwargs)
+    def post(self, url, **kwargs): return self.request("POST", url, **kwargs)
+    def put(self, url, **kwargs): return self.request("PUT", url, **kwargs)
+    def patch(self, url, **kwargs): return self.request("PATCH", url, **kwargs)
+    def delete(self, url, **kwargs): return self.request("DELETE", url, **kwargs)
+
+    def batch(self, api_root, operations, chunk_size=BATCH_MAX_REQUESTS):
+        """Schickt Operationen als JSON-$batch an api_root.
+
+        operations: Liste von Dicts mit method, url (relativ zu api_root) und optional body.
+        Liefert pro Operation (in Eingabe-Reihenfolge) ein Dict mit status und body.
+        Ohne atomicityGroup, damit ein "already exists" nicht den ganzen Block kippt.
+        """
+        results = []
+        chunk_size = max(1, min(chunk_size, 100))
+        for start in range(0, len(operations), chunk_size):
+            chunk = operations[start:start + chunk_size]
+            payload = {"requests": []}
+            for i, op in enumerate(chunk):
+                req = {"id": str(i), "method": op["method"], "url": op["url"]}
+                if op.get("body") is not None:
+                    req["headers"] = {"Content-Type": "application/json"}
+                    req["body"] = op["body"]
+                payload["requests"].append(req)
+            r = self.post(f"{api_root}/$batch", json=payload, headers={"Accept": "application/json"})
+            by_id = {}
+            if r.status_code == 200:
+                for resp in r.json().get("responses", []):
+                    by_id[str(resp.get("id"))] = {"status": resp.get("status"), "body": resp.get("body")}
+            for i in range(len(chunk)):
+                # Fehlt eine Antwort (oder scheitert der ganze Batch), zählt sie mit dem Batch-Status
+                results.append(by_id.get(str(i), {"status": r.status_code, "body": r.text}))
+        return results
+
+    def stats(self):
+        """Anfragen pro Endpunkt (inkl. Retries, 401-Refreshes und Verbindungsfehler)."""
+        with self.lock:
+            return dict(sorted(self.counters.items()))
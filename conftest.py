@@ -0,0 +1,2 @@
+# test_db.py ist ein manueller Verbindungstest gegen die echte Supabase-Instanz, kein Unit-Test
+collect_ignore = ["test_db.py"]
@@ -1,11 +1,18 @@
-import requests
 import re
 import os
 import json
 import time
+import threading
+import bisect
+import heapq
+from collections import Counter
 from difflib import SequenceMatcher
-from PIL import Image, ImageDraw
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from bc_mirror import CatalogMirror
+from bc_transport import BCTransport
+from manufacturer_resolver import ManufacturerResolver
+from image_pipeline import load_and_process
 
 # Lädt die Variablen aus der .env Datei in VS Code
 load_dotenv()
@@ -23,6 +30,7 @@ COMPANY_ID    = os.environ.get("BC_COMPANY_ID", "")
 ITEM_CATEGORY = ""  
 UNIT_CODE     = "GR"
 FILLING_CODE  = "100.XXX"
+DEFAULT_IMAGE_PATH = "Produkt_Bilder/default_flower.jpg"
 
 ODATA_ATTR_SERVICE  = "Artikelattribute_SD"        
 ODATA_VAL_SERVICE   = "Artikelattributwerte_SD"    
@@ -33,6 +41,15 @@ API_VERSION   = "v2.0"         # Aus AL-Page: APIVersion = 'v2.0'
 # Für die Attribute:
 API_ENTITY    = "itemAttributeMappings" # Aus EntitySetName
 
+# Lokaler Katalog-Spiegel (SQLite): Warmstart von Platte, bei BC nur Änderungen holen
+MIRROR_ENABLED       = os.environ.get("BC_MIRROR", "1") != "0"
+MIRROR_DIR           = os.environ.get("BC_MIRROR_DIR", ".bc_cache")
+MIRROR_MAX_AGE_HOURS = float(os.environ.get("BC_MIRROR_MAX_AGE_HOURS", "24"))  # Danach Voll-Sync (erkennt Löschungen)
+ODATA_MODIFIED_FIELD = "SystemModifiedAt"  # Änderungsdatum in den OData-Attribut-Services
+
+TOKEN_REFRESH_MARGIN = 300  # Sekunden vor Ablauf wird das Token erneuert
+BATCH_CHANGESET_SIZE = int(os.environ.get("BC_BATCH_SIZE", "50"))  # Requests pro $batch-Aufruf (max. 100)
+
 START_NUMMER  = 3000   
 PREFIX        = "100." 
 
@@ -44,6 +61,16 @@ SYNC_CLIENTS = [
     "CITY_UAT", "COL_UAT", "COL_UAT2", "EA_UAT", "OP_UAT", 
     "SASB_UAT", "SPIT_UAT", "UAT_PELIKAN", "VIT_UAT", "FINC_UAT"
 ]
+SYNC_MAX_WORKERS = 10  # Parallele itemSyncs-Posts
+
+# Bulk-Import (create_items_bulk): Parallelität pro Stufe
+BULK_MAX_IN_FLIGHT = 8
+BULK_STAGE_WORKERS = {"post": 4, "image": 4, "attributes": 4, "sync": 2, "status": 2}
+
+# Ergebnis pro Partner-Client
+SYNC_CREATED = "created"
+SYNC_EXISTS  = "exists"
+SYNC_FAILED  = "failed"
 
 # ==========================================
 # HELPER & CLEANING
@@ -56,21 +83,6 @@ def clean_string_global(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def remove_watermark_rectangle(file_path):
-    try:
-        with Image.open(file_path) as img:
-            img = img.convert("RGB")
-            width, height = img.size
-            draw = ImageDraw.Draw(img)
-            # Koordinaten für das Rechteck unten rechts (Flowzz Logo)
-            rect_width = 380
-            rect_height = 160
-            coords = [width - rect_width, height - rect_height, width, height]
-            draw.rectangle(coords, fill=(255, 255, 255), outline=None)
-            img.save(file_path, quality=95)
-    except Exception as e:
-        print(f"      ⚠️ Warnung: Konnte Wasserzeichen nicht entfernen: {e}")
-
 # ==========================================
 # MAPPINGS
 # ==========================================
@@ -127,6 +139,343 @@ MANUFACTURER_CODE_MAPPING = {
     "Weeco": "WEECO", "WMG Pharma": "WMG"
 }
 
+# Einmal beim Import kompiliert: exakt (casefold), sonst längster Teilstring-Treffer
+MANUFACTURER_RESOLVER = ManufacturerResolver(MANUFACTURER_CODE_MAPPING)
+
+def resolve_manufacturer_code(name):
+    return MANUFACTURER_RESOLVER.resolve(name)
+
+# ==========================================
+# ARTIKELNUMMERN
+# ==========================================
+NUMBER_COLLISION_RETRIES = 5    # Neue Nummer ziehen, wenn BC "already exists" meldet
+
+def parse_item_number(nr):
+    if not nr or not nr.startswith(PREFIX): return None
+    try: return int(nr[len(PREFIX):])
+    except ValueError: return None
+
+def is_duplicate_key_error(response):
+    text = response.text.lower()
+    return response.status_code in [400, 409] and ("already exists" in text or "bereits vorhanden" in text or "existiert bereits" in text)
+
+class ItemNumberAllocator:
+    """Hält die höchste vergebene Nummer im Speicher; einmal vom Server geseedet, danach O(1)."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None
+
+    def _ensure_seed(self, fetch_max):
+        if self.current is None: self.current = max(START_NUMMER, fetch_max())
+
+    def next(self, fetch_max):
+        with self.lock:
+            self._ensure_seed(fetch_max)
+            self.current += 1
+            return f"{PREFIX}{self.current}"
+
+    def reserve(self, count, fetch_max):
+        with self.lock:
+            self._ensure_seed(fetch_max)
+            first = self.current + 1
+            self.current += count
+            return [f"{PREFIX}{n}" for n in range(first, self.current + 1)]
+
+    def reseed(self, fetch_max, collided=None):
+        """Nach einer Nummern-Kollision (anderer Prozess war schneller): Server-Stand neu holen und
+        dahinter weitermachen. Nie unter bereits vergebene bzw. reservierte Nummern zurück."""
+        with self.lock:
+            self.current = max(self.current or 0, parse_item_number(collided) or 0, fetch_max()) + 1
+            return f"{PREFIX}{self.current}"
+
+# Ein Allocator pro Firma und Prozess, damit parallele Dashboard-Sessions sich nicht überschneiden
+_NUMBER_ALLOCATORS = {}
+_NUMBER_ALLOCATORS_LOCK = threading.Lock()
+
+def get_number_allocator(key):
+    with _NUMBER_ALLOCATORS_LOCK:
+        return _NUMBER_ALLOCATORS.setdefault(key, ItemNumberAllocator())
+
+# ==========================================
+# ATTRIBUTWERT-INDEX
+# ==========================================
+BRAND_IGNORE_WORDS = ["gmbh", "ag", "limited", "ltd", "pharma", "pharm", "medical", "cannabis", "deutschland", "germany", "europe", "healthcare", "therapeutics", "labs"]
+
+def normalize_for_match(s):
+    return re.sub(r'[\W_]+', '', s.lower())
+
+def normalize_brand(name):
+    n = name.lower()
+    for word in BRAND_IGNORE_WORDS: n = n.replace(word, "")
+    return re.sub(r'[^a-z0-9]', '', n)
+
+# VALUE_MAPPINGS einmalig normalisiert (erster Treffer gewinnt, wie in der Schleife)
+VALUE_MAPPINGS_NORMALIZED = {}
+for _attr, _mappings in VALUE_MAPPINGS.items():
+    VALUE_MAPPINGS_NORMALIZED[_attr] = {}
+    for _key, _target in _mappings.items():
+        VALUE_MAPPINGS_NORMALIZED[_attr].setdefault(normalize_for_match(_key), _target)
+
+class ValueIndex:
+    """Hash-Lookup für die Werte eines Attributs; Treffer entsprechen dem früheren linearen Scan
+    (erster passender Wert in Cache-Reihenfolge gewinnt)."""
+    def __init__(self, values=None, brand=False):
+        self.brand = brand
+        self.by_key = {}       # lower().strip() -> (Position, ID)
+        self.by_core = {}      # normalize_brand -> (Position, ID), nur für Hersteller
+        self.cores = []        # Kerne mit > 2 Zeichen für die Teilstring-Suche
+        self.core_hits = []
+        self._blob = None
+        self._offsets = []
+        self.size = 0
+        for value, value_id in (values or {}).items():
+            self.add(value, value_id)
+
+    def add(self, value, value_id):
+        pos = self.size
+        self.size += 1
+        self.by_key.setdefault(value.lower().strip(), (pos, value_id))
+        if self.brand:
+            core = normalize_brand(value)
+            self.by_core.setdefault(core, (pos, value_id))
+            if len(core) > 2:
+                self.cores.append(core)
+                self.core_hits.append((pos, value_id))
+                self._blob = None
+
+    def find(self, clean_val):
+        if not self.brand:
+            hit = self.by_key.get(clean_val.lower().strip())
+            return hit[1] if hit else None
+
+        input_core = normalize_brand(clean_val)
+        best = self.by_core.get(input_core)
+        if len(input_core) > 2:
+            # BC-Kern steckt im Input: alle Teilstrings (>2 Zeichen) des Inputs nachschlagen
+            for i in range(len(input_core)):
+                for j in range(i + 3, len(input_core) + 1):
+                    hit = self.by_core.get(input_core[i:j])
+                    if hit and (best is None or hit[0] < best[0]): best = hit
+            # Input steckt im BC-Kern: eine Suche über alle Kerne am Stück
+            if self._blob is None:
+                self._blob = "|".join(self.cores)
+                self._offsets, off = [], 0
+                for core in self.cores:
+                    self._offsets.append(off)
+                    off += len(core) + 1
+            idx = self._blob.find(input_core)
+            while idx != -1:
+                hit = self.core_hits[bisect.bisect_right(self._offsets, idx) - 1]
+                if best is None or hit[0] < best[0]: best = hit
+                idx = self._blob.find(input_core, idx + 1)
+        return best[1] if best else None
+
+# ==========================================
+# MATCHING INDEX
+# ==========================================
+MATCH_IGNORE_WORDS = ["cannabis", "flos", "blüten", "extract", "gmbh", "kultivar", "strain"]
+
+def remove_fillers(text):
+    # Stärkere Bereinigung für den Vergleich (Entfernt auch ' und - und .)
+    t = str(text).lower()
+    for w in MATCH_IGNORE_WORDS: t = t.replace(w, "")
+    # Hier entfernen wir alles was KEIN Buchstabe/Zahl ist (also auch Apostrophe!)
+    return re.sub(r'[^\w\s]', '', t).strip()
+
+def token_sort_key(text):
+    # Erlaubt auch Buchstaben in Zahlen-Kontext
+    s = re.sub(r'[^\w\s/]', '', str(text).lower())
+    return " ".join(sorted(s.split()))
+
+def build_match_entry(name, number=None):
+    """Bereitet einen Artikelnamen einmalig für den Fuzzy-Abgleich auf."""
+    name = name or ""
+    clean = remove_fillers(name)
+    tokens = token_sort_key(name)
+    return {
+        'name': name,
+        'number': number,
+        'clean': clean,
+        'tokens': tokens,
+        'lower': name.lower(),
+        'fractions': tuple(re.findall(r'\d+/\d+', name)),
+        # Zeichen-Häufigkeiten für die günstige Obergrenze (wie SequenceMatcher.quick_ratio)
+        'clean_counts': Counter(clean),
+        'token_counts': Counter(tokens),
+    }
+
+def _bounded_ratio(a, b, counts_a, counts_b, score, need):
+    """Exakte SequenceMatcher-Ratio oder None, wenn sie score/need sicher nicht übertrifft."""
+    total = len(a) + len(b)
+    if not total: return SequenceMatcher(None, a, b).ratio()
+    # Stufe 1: Längen-Grenze (real_quick_ratio)
+    upper = 2.0 * min(len(a), len(b)) / total
+    if upper <= score or upper < need: return None
+    # Stufe 2: Zeichen-Multiset (quick_ratio)
+    upper = 2.0 * sum(min(c, counts_b.get(ch, 0)) for ch, c in counts_a.items()) / total
+    if upper <= score or upper < need: return None
+    return SequenceMatcher(None, a, b).ratio()
+
+def score_match_entry(new_entry, entry, score_cutoff=0.0):
+    """Bewertet einen vorbereiteten neuen Namen gegen einen Index-Eintrag.
+
+    Gibt None zurück, wenn der Kandidat score_cutoff sicher nicht erreicht. Alle
+    Ergebnisse >= score_cutoff sind identisch mit dem vollständigen Vergleich.
+    """
+    # 3. Nummern-Check (Strafpunkt, wenn Zahlen nicht stimmen, z.B. 20/1 vs 22/1)
+    # Wird vorab bestimmt, damit die Grenzen für die teuren Ratios greifen
+    penalty = 0.0
+    if new_entry['fractions'] and entry['fractions']:
+        if new_entry['fractions'][0] != entry['fractions'][0]:
+            penalty = 0.5
+
+    # C) Wenn wir Sonderzeichen ignorieren (remove_fillers), sind sie identisch?
+    # Das fängt "Casper's" vs "Casper’s" ab! Die Standard-Ratio ist dann ohnehin 1.0.
+    if new_entry['clean'] == entry['clean']:
+        current_score = 1.0 - penalty
+        return current_score if current_score >= score_cutoff else None
+
+    # 2. TURBO BOOST: Startswith Check
+    # Da 'main_script' jetzt den Namen simuliert ("Name - Kultivar"), 
+    # muss dieser fast identisch mit dem BC Namen sein.
+    # Wir prüfen "Starts with" in beide Richtungen für maximale Sicherheit.
+
+    # A) BC Name fängt mit Neuem Namen an (Klassiker)
+    # B) Neuer Name fängt mit BC Namen an (Falls BC kürzer ist)
+    current_score = 0.0
+    if entry['lower'].startswith(new_entry['lower']) or new_entry['lower'].startswith(entry['lower']):
+        current_score = 0.95
+
+    # 1. Standard Mathe-Vergleich, nur wenn die Obergrenze das Ergebnis noch ändern kann
+    need = score_cutoff + penalty
+    score_normal = _bounded_ratio(new_entry['clean'], entry['clean'],
+                                  new_entry['clean_counts'], entry['clean_counts'], current_score, need)
+    if score_normal is not None and score_normal > current_score: current_score = score_normal
+    if new_entry['name'] and entry['name']:
+        score_token = _bounded_ratio(new_entry['tokens'], entry['tokens'],
+                                     new_entry['token_counts'], entry['token_counts'], current_score, need)
+        if score_token is not None and score_token > current_score: current_score = score_token
+
+    current_score = current_score - penalty
+    return current_score if current_score >= score_cutoff else None
+
+# Schwellen für die Einstufung im Nightly-Run
+MATCH_DUPLICATE_THRESHOLD = 0.98
+MATCH_REVIEW_THRESHOLD    = 0.85
+
+# Kandidaten-Vorauswahl (Trigramm-Index) statt Vollvergleich gegen den ganzen Artikelstamm
+MATCH_EXHAUSTIVE      = False   # True = altes Verhalten, jeder Artikel wird voll bewertet
+MATCH_TOP_K           = 250     # So viele Kandidaten (nach geteilten Trigrammen) gehen an den Scorer
+MATCH_BLOCK_BY_PREFIX = False   # Nur Artikel mit gleichem erstem Wort (meist Hersteller) als Kandidaten
+
+# Parallele Batch-Bewertung (get_match_info_batch)
+MATCH_WORKERS            = int(os.environ.get("MATCH_WORKERS", os.cpu_count() or 1))
+MATCH_BATCH_MIN_PARALLEL = 8     # Darunter lohnt sich der Prozess-Start nicht
+
+def classify_match_score(score):
+    if score > MATCH_DUPLICATE_THRESHOLD: return "DUPLICATE"
+    if score > MATCH_REVIEW_THRESHOLD: return "REVIEW"
+    return "READY"
+
+def char_ngrams(text, n=3):
+    t = f"  {text} "
+    return {t[i:i + n] for i in range(len(t) - n + 1)}
+
+class MatchIndex:
+    """Vorbereitete Match-Einträge plus Trigramm-, Präfix- und Block-Indizes."""
+    def __init__(self, items=None):
+        self.entries = []
+        self.grams = {}          # Trigramm -> Positionen
+        self.blocks = {}         # Erstes Wort -> Positionen
+        self.by_clean = {}       # remove_fillers-Name -> Positionen
+        self.by_lower = {}       # Kleingeschriebener Name -> Positionen
+        self.sorted_lower = []   # Sortiert für "BC Name fängt mit neuem Namen an"
+        self.sorted_pos = []
+        for item in items or []:
+            self.add(item.get('displayName'), item.get('number'))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name, number=None):
+        entry = build_match_entry(name, number)
+        pos = len(self.entries)
+        self.entries.append(entry)
+        for g in char_ngrams(entry['clean']):
+            self.grams.setdefault(g, []).append(pos)
+        self.blocks.setdefault(self.block_key(entry), []).append(pos)
+        self.by_clean.setdefault(entry['clean'], []).append(pos)
+        self.by_lower.setdefault(entry['lower'], []).append(pos)
+        i = bisect.bisect_right(self.sorted_lower, entry['lower'])
+        self.sorted_lower.insert(i, entry['lower'])
+        self.sorted_pos.insert(i, pos)
+        return entry
+
+    @staticmethod
+    def block_key(entry):
+        parts = entry['clean'].split()
+        return parts[0] if parts else ""
+
+    def _boost_positions(self, new_entry):
+        # Alle Einträge, die über Starts-With oder gleichen bereinigten Namen geboostet würden
+        found = set(self.by_clean.get(new_entry['clean'], ()))
+        prefix = new_entry['lower']
+        lo = bisect.bisect_left(self.sorted_lower, prefix)
+        hi = bisect.bisect_left(self.sorted_lower, prefix + "\U0010ffff")
+        found.update(self.sorted_pos[lo:hi])
+        for i in range(len(prefix) + 1):
+            found.update(self.by_lower.get(prefix[:i], ()))
+        return found
+
+    def candidates(self, new_entry, top_k=MATCH_TOP_K, block_by_prefix=MATCH_BLOCK_BY_PREFIX):
+        """Positionen der Top-K Kandidaten in Original-Reihenfolge (wichtig für gleiche Tie-Breaks)."""
+        hits = {}
+        for g in char_ngrams(new_entry['clean']):
+            for pos in self.grams.get(g, ()):
+                hits[pos] = hits.get(pos, 0) + 1
+        if block_by_prefix:
+            allowed = set(self.blocks.get(self.block_key(new_entry), ()))
+            hits = {pos: c for pos, c in hits.items() if pos in allowed}
+        found = {pos for pos, _ in heapq.nlargest(top_k, hits.items(), key=lambda kv: kv[1])}
+        found.update(self._boost_positions(new_entry))
+        return sorted(found)
+
+    def best_match(self, new_name, exhaustive=None, score_cutoff=0.0):
+        """Bester Treffer; Kandidaten unter score_cutoff oder dem laufenden Bestwert werden früh verworfen."""
+        best_score = 0.0
+        best_name = "Kein Vergleichswert"
+        best_no = None
+        if not self.entries: return best_name, 0.0, None
+        if exhaustive is None: exhaustive = MATCH_EXHAUSTIVE
+
+        # Der neue Name wird nur einmal normalisiert, der BC-Bestand liegt bereits im Index
+        new_entry = build_match_entry(new_name)
+        entries = self.entries
+        if not exhaustive and len(entries) > MATCH_TOP_K:
+            entries = [entries[pos] for pos in self.candidates(new_entry)]
+
+        for entry in entries:
+            current_score = score_match_entry(new_entry, entry, max(score_cutoff, best_score))
+
+            # Besten Treffer speichern
+            if current_score is not None and current_score > best_score:
+                best_score = current_score
+                best_name = entry['name']
+                best_no = entry['number']
+
+        return best_name, best_score, best_no
+
+# --- Worker-Prozesse für get_match_info_batch ---
+_WORKER_INDEX = None
+
+def _init_match_worker(index):
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+
+def _match_worker(args):
+    new_name, exhaustive, score_cutoff = args
+    return _WORKER_INDEX.best_match(new_name, exhaustive, score_cutoff)
+
 CREATE_NEW_VALUES = True 
 MAX_ITEMS_PRO_SPALTE = 3
 
@@ -140,13 +489,28 @@ class BusinessCentralConnector:
         self.custom_api_root = f"https://api.businesscentral.dynamics.com/v2.0/{TENANT_ID}/{ENVIRONMENT}/api/{API_PUBLISHER}/{API_GROUP}/{API_VERSION}"
         
         self.token = None
-        self.company_id = COMPANY_ID
-        self.company_name = "" 
-        self.existing_items_cache = [] 
-        self.attributes_cache = {} 
+        self.token_expires_at = 0
+        self.token_lock = threading.Lock()
+        self.http = BCTransport(self._get_token)
+        self.mirror = None
+        self.force_full_sync = False
+        # Firma, Artikelstamm und Attribute werden erst geladen, wenn eine Methode sie braucht
+        self._company_id = COMPANY_ID
+        self._company_name = ""
+        self._items_cache = None
+        self._match_index = None
+        self._attributes_cache = None
+        self.cache_lock = threading.RLock()   # Caches & Indizes bei parallelen Importen
+        self._match_pool = None               # Worker-Prozesse für get_match_info_batch (ein Pool pro Lauf)
+        self._match_pool_key = None
+        self._match_pool_lock = threading.Lock()
 
-    def authenticate(self):
+    def authenticate(self, force_full_sync=False):
         print("🔑 Verbinde mit Business Central...")
+        self._fetch_token()
+        self.force_full_sync = force_full_sync
+
+    def _fetch_token(self):
         url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
         data = {
             "grant_type": "client_credentials",
@@ -154,21 +518,73 @@ class BusinessCentralConnector:
             "client_secret": CLIENT_SECRET,
             "scope": "https://api.businesscentral.dynamics.com/.default"
         }
-        r = requests.post(url, data=data)
+        r = self.http.post(url, data=data, auth=False)
         if r.status_code == 200:
-            self.token = r.json().get("access_token")
-            if not self.company_id:
-                self._get_company_id()
-            else:
-                self._find_company_name()
-            self._load_existing_items()
-            self._load_odata_attributes() 
+            token_data = r.json()
+            self.token = token_data.get("access_token")
+            self.token_expires_at = time.time() + int(token_data.get("expires_in", 3600))
         else:
             raise Exception(f"Login fehlgeschlagen! ({r.text})")
 
+    def _get_token(self, force_refresh=False):
+        # Token kurz vor Ablauf (oder nach 401) transparent erneuern
+        with self.token_lock:
+            if force_refresh or not self.token or time.time() > self.token_expires_at - TOKEN_REFRESH_MARGIN:
+                self._fetch_token()
+            return self.token
+
+    def load_catalog(self):
+        """Lädt Artikelstamm und Attribute sofort (z.B. vor Bulk-Läufen)."""
+        self._load_existing_items(self.force_full_sync)
+        self._load_odata_attributes(self.force_full_sync)
+
+    # --- Lazy Properties ---
+    @property
+    def company_id(self):
+        if not self._company_id: self._get_company_id()
+        return self._company_id
+
+    @company_id.setter
+    def company_id(self, value):
+        self._company_id = value
+
+    @property
+    def company_name(self):
+        if not self._company_name:
+            if not self._company_id: self._get_company_id()
+            else: self._find_company_name()
+        return self._company_name
+
+    @company_name.setter
+    def company_name(self, value):
+        self._company_name = value
+
+    @property
+    def existing_items_cache(self):
+        if self._items_cache is None: self._load_existing_items(self.force_full_sync)
+        return self._items_cache
+
+    @existing_items_cache.setter
+    def existing_items_cache(self, value):
+        self._items_cache = value
+        self._match_index = None
+
+    @property
+    def match_index(self):
+        if self._match_index is None: self._rebuild_match_index()
+        return self._match_index
+
+    @property
+    def attributes_cache(self):
+        if self._attributes_cache is None: self._load_odata_attributes(self.force_full_sync)
+        return self._attributes_cache
+
+    @attributes_cache.setter
+    def attributes_cache(self, value):
+        self._attributes_cache = value
+
     def _get_company_id(self):
-        headers = {"Authorization": f"Bearer {self.token}"}
-        r = requests.get(f"{self.base_url}/companies", headers=headers)
+        r = self.http.get(f"{self.base_url}/companies")
         if r.status_code == 200:
             val = r.json().get('value', [])
             if val: 
@@ -180,210 +596,252 @@ class BusinessCentralConnector:
                 raise Exception("Keine Firma gefunden!")
 
     def _find_company_name(self):
-        headers = {"Authorization": f"Bearer {self.token}"}
-        r = requests.get(f"{self.base_url}/companies({self.company_id})", headers=headers)
+        r = self.http.get(f"{self.base_url}/companies({self.company_id})")
         if r.status_code == 200:
             self.company_name = r.json().get('name')
 
-    def _load_existing_items(self):
-        print("⏳ Lade Artikelstamm...")
-        headers = {"Authorization": f"Bearer {self.token}"}
-        url = f"{self.base_url}/companies({self.company_id})/items?$select=id,number,displayName"
-        r = requests.get(url, headers=headers)
+    def get_item_by_number(self, item_no):
+        """Einzelner Artikel per Server-Filter, ohne den ganzen Artikelstamm zu laden."""
+        if self._items_cache is not None:
+            return next((i for i in self._items_cache if i.get('number') == item_no), None)
+        safe_no = str(item_no).replace("'", "''")
+        url = f"{self.base_url}/companies({self.company_id})/items?$filter=number eq '{safe_no}'&$select=id,number,displayName"
+        r = self.http.get(url, timeout=20)
         if r.status_code == 200:
-            self.existing_items_cache = r.json().get('value', [])
-            print(f"✅ {len(self.existing_items_cache)} Artikel im Cache.")
+            val = r.json().get('value', [])
+            return val[0] if val else None
+        return None
+
+    def _get_mirror(self):
+        if self.mirror is None:
+            path = ":memory:"
+            if MIRROR_ENABLED:
+                path = os.path.join(MIRROR_DIR, f"bc_mirror_{ENVIRONMENT}_{self.company_id}.sqlite")
+            self.mirror = CatalogMirror(path)
+        return self.mirror
+
+    def _get_paged(self, url):
+        """Lädt alle Seiten eines (OData-)Endpunkts über @odata.nextLink. None bei Fehler."""
+        rows = []
+        while url:
+            r = self.http.get(url)
+            if r.status_code != 200: return None
+            data = r.json()
+            rows.extend(data.get('value', []))
+            url = data.get('@odata.nextLink')
+        return rows
+
+    def _sync_rows(self, kind, url, modified_field, force_full=False):
+        """Holt nur Änderungen seit dem letzten Wasserstand, sonst (oder wenn Delta scheitert) alles."""
+        mirror = self._get_mirror()
+        watermark = None
+        if not force_full and not mirror.is_stale(kind, MIRROR_MAX_AGE_HOURS):
+            watermark = mirror.get_state(f"{kind}_watermark")
+
+        rows, full = None, False
+        if watermark:
+            sep = "&" if "?" in url else "?"
+            rows = self._get_paged(f"{url}{sep}$filter={modified_field} gt {watermark}")
+        if rows is None:
+            rows, full = self._get_paged(url), True
+        if rows is None: return None, False
 
-    def _load_odata_attributes(self):
+        stamps = [r[modified_field] for r in rows if r.get(modified_field)]
+        if stamps:
+            mirror.set_state(f"{kind}_watermark", max(stamps + ([watermark] if watermark else [])))
+        elif full:
+            # Service liefert kein Änderungsdatum -> nächstes Mal wieder voll laden
+            mirror.set_state(f"{kind}_watermark", "")
+        return rows, full
+
+    def _sync_items_mirror(self, force_full=False):
+        """Bringt die Artikel im Spiegel auf BC-Stand (Delta, sonst voll). Liefert (rows, full)."""
+        mirror = self._get_mirror()
+        url = f"{self.base_url}/companies({self.company_id})/items?$select=id,number,displayName,lastModifiedDateTime"
+        rows, full = self._sync_rows("items", url, "lastModifiedDateTime", force_full)
+        if rows is None:
+            print("   ⚠️ BC nicht erreichbar, nutze lokalen Spiegel.")
+        else:
+            mirror.upsert_items(rows, replace=full)
+            if full: mirror.mark_full_sync("items")
+        return rows, full
+
+    def _load_existing_items(self, force_full=False):
+        print("⏳ Lade Artikelstamm...")
+        rows, full = self._sync_items_mirror(force_full)
+        # Der Setter verwirft den alten Index; neu gebaut wird er erst beim nächsten Zugriff auf match_index
+        self.existing_items_cache = self._get_mirror().load_items()
+        mode = "Voll-Sync" if full else "Delta"
+        print(f"✅ {len(self.existing_items_cache)} Artikel im Cache ({mode}: {len(rows or [])} geladen).")
+
+    def _load_odata_attributes(self, force_full=False):
         print("⏳ Lade Attribute und Werte über OData...")
-        headers = {"Authorization": f"Bearer {self.token}"}
+        mirror = self._get_mirror()
         comp_part = f"Company('{self.company_name}')"
         
         url_attr = f"{self.odata_root}/{comp_part}/{ODATA_ATTR_SERVICE}"
-        r = requests.get(url_attr, headers=headers)
-        if r.status_code == 200:
-            for a in r.json().get('value', []):
+        attrs, full = self._sync_rows("attributes", url_attr, ODATA_MODIFIED_FIELD, force_full)
+        if attrs is not None:
+            parsed = []
+            for a in attrs:
                 k_id = next((k for k in ['ID','id'] if k in a), 'ID')
                 k_name = next((k for k in ['Name','name'] if k in a), 'Name')
-                self.attributes_cache[a[k_name]] = {'id': a[k_id], 'values': {}}
+                parsed.append((a[k_id], a[k_name]))
+            mirror.upsert_attributes(parsed, replace=full)
+            if full: mirror.mark_full_sync("attributes")
         
         url_vals = f"{self.odata_root}/{comp_part}/{ODATA_VAL_SERVICE}"
-        r_vals = requests.get(url_vals, headers=headers)
-        if r_vals.status_code == 200:
-            vals = r_vals.json().get('value', [])
+        vals, full = self._sync_rows("attribute_values", url_vals, ODATA_MODIFIED_FIELD, force_full)
+        if vals is not None:
+            parsed = []
             if vals:
                 vf = vals[0]
                 k_aid = next((k for k in ['Attribute_ID','AttributeID'] if k in vf), 'Attribute_ID')
                 k_vid = next((k for k in ['ID','id'] if k in vf), 'ID')
                 k_val = next((k for k in ['Value','value','Name'] if k in vf), 'Value')
-                
                 for v in vals:
-                    try:
-                        p_aid = v.get(k_aid)
-                        p_val = str(v.get(k_val))
-                        p_vid = v.get(k_vid)
-                        for attr_data in self.attributes_cache.values():
-                            if attr_data['id'] == p_aid:
-                                attr_data['values'][p_val] = p_vid
+                    try: parsed.append((v.get(k_vid), v.get(k_aid), str(v.get(k_val))))
                     except: pass
+            mirror.upsert_attribute_values(parsed, replace=full)
+            if full: mirror.mark_full_sync("attribute_values")
+
+        # Attribut-ID -> Name einmal aufbauen, dann ist jede Wertzeile ein Dict-Zugriff
+        cache = {}
+        id_to_name = {}
+        for a_id, a_name in mirror.load_attributes():
+            cache[a_name] = {'id': a_id, 'values': {}}
+            id_to_name[a_id] = a_name
+        for p_vid, p_aid, p_val in mirror.load_attribute_values():
+            a_name = id_to_name.get(p_aid)
+            if a_name is not None: cache[a_name]['values'][p_val] = p_vid
+        for a_name, attr_data in cache.items():
+            attr_data['index'] = ValueIndex(attr_data['values'], brand=(a_name == "Hersteller"))
+        self.attributes_cache = cache
         print(f"✅ Attribute geladen.")
 
+    def _value_index(self, attr_name):
+        attr_data = self.attributes_cache[attr_name]
+        if 'index' not in attr_data:
+            attr_data['index'] = ValueIndex(attr_data['values'], brand=(attr_name == "Hersteller"))
+        return attr_data['index']
+
     def _ensure_value_exists(self, attr_name, attr_id, raw_val):
         clean_val = clean_string_global(raw_val)
         if not clean_val: return None
 
-        def normalize_for_match(s):
-            return re.sub(r'[\W_]+', '', s.lower())
-
-        if attr_name in VALUE_MAPPINGS:
-            val_norm = normalize_for_match(clean_val)
-            for map_key, map_target in VALUE_MAPPINGS[attr_name].items():
-                if normalize_for_match(map_key) == val_norm:
-                    clean_val = map_target
-                    break 
+        if attr_name in VALUE_MAPPINGS_NORMALIZED:
+            clean_val = VALUE_MAPPINGS_NORMALIZED[attr_name].get(normalize_for_match(clean_val), clean_val)
         
-        cached_values = self.attributes_cache[attr_name]['values']
-        search_key_strict = clean_val.lower().strip()
-
-        if attr_name == "Hersteller":
-            ignore_words = ["gmbh", "ag", "limited", "ltd", "pharma", "pharm", "medical", "cannabis", "deutschland", "germany", "europe", "healthcare", "therapeutics", "labs"]
-            def normalize_brand(name):
-                n = name.lower()
-                for word in ignore_words: n = n.replace(word, "")
-                return re.sub(r'[^a-z0-9]', '', n)
-
-            input_core = normalize_brand(clean_val)
-            for existing_name, existing_id in cached_values.items():
-                bc_core = normalize_brand(existing_name)
-                is_match = False
-                if input_core == bc_core: is_match = True
-                elif len(input_core) > 2 and len(bc_core) > 2:
-                     if input_core in bc_core or bc_core in input_core: is_match = True
-                if is_match: return existing_id
-        else:
-            for existing_name, existing_id in cached_values.items():
-                if existing_name.lower().strip() == search_key_strict:
-                    return existing_id
-
-        ALLOWED_TO_CREATE = ["Produktname", "Kultivar", "URL", "Hersteller"] 
-        if attr_name not in ALLOWED_TO_CREATE:
-            print(f"      ⚠️ STRICT MODE: Wert '{clean_val}' existiert nicht für '{attr_name}' (Skip).")
-            return None 
-
-        if CREATE_NEW_VALUES:
-            print(f"      🆕 Erstelle neuen Wert: '{clean_val}' für '{attr_name}'...")
-            headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
-            comp_part = f"Company('{self.company_name}')"
-            url = f"{self.odata_root}/{comp_part}/{ODATA_VAL_SERVICE}"
-            payload = { "Attribute_ID": attr_id, "Value": clean_val }
-            r = requests.post(url, headers=headers, json=payload)
-            if r.status_code in [200, 201]:
-                data = r.json()
-                new_id = data.get('ID') or data.get('id')
-                if new_id:
-                    self.attributes_cache[attr_name]['values'][clean_val] = new_id
-                    return new_id
-        return None
+        # Lock: bei parallelen Importen darf derselbe neue Wert nicht zweimal angelegt werden
+        with self.cache_lock:
+            # Hersteller: Kern-Abgleich inkl. Teilstrings, sonst exakter Vergleich (case-insensitive)
+            existing_id = self._value_index(attr_name).find(clean_val)
+            if existing_id is not None: return existing_id
+
+            ALLOWED_TO_CREATE = ["Produktname", "Kultivar", "URL", "Hersteller"] 
+            if attr_name not in ALLOWED_TO_CREATE:
+                print(f"      ⚠️ STRICT MODE: Wert '{clean_val}' existiert nicht für '{attr_name}' (Skip).")
+                return None 
+
+            if CREATE_NEW_VALUES:
+                print(f"      🆕 Erstelle neuen Wert: '{clean_val}' für '{attr_name}'...")
+                comp_part = f"Company('{self.company_name}')"
+                url = f"{self.odata_root}/{comp_part}/{ODATA_VAL_SERVICE}"
+                payload = { "Attribute_ID": attr_id, "Value": clean_val }
+                r = self.http.post(url, json=payload)
+                if r.status_code in [200, 201]:
+                    data = r.json()
+                    new_id = data.get('ID') or data.get('id')
+                    if new_id:
+                        self.attributes_cache[attr_name]['values'][clean_val] = new_id
+                        self._value_index(attr_name).add(clean_val, new_id)
+                        self._get_mirror().upsert_attribute_values([(new_id, attr_id, clean_val)])
+                        return new_id
+            return None
+
+    def _allocator(self):
+        return get_number_allocator(f"{ENVIRONMENT}/{self.company_id}")
+
+    def _fetch_max_item_number(self, refresh=False):
+        """Höchste vergebene 100.-Nummer, numerisch verglichen (BC sortiert Nummern als Text: 100.999 > 100.3599).
+        Aus dem geladenen Artikelstamm, sonst (oder mit refresh) aus dem per Delta aktualisierten Spiegel."""
+        if self._items_cache is not None and not refresh:
+            with self.cache_lock:
+                values = [parse_item_number(item.get('number', '')) for item in self._items_cache]
+            return max([START_NUMMER] + [v for v in values if v])
+        self._sync_items_mirror(self.force_full_sync)
+        return max(START_NUMMER, self._get_mirror().max_item_number(PREFIX) or 0)
 
     def find_next_number(self):
-        max_val = START_NUMMER
-        for item in self.existing_items_cache:
-            nr = item.get('number', '')
-            if nr.startswith(PREFIX):
-                try:
-                    val = int(nr.split(PREFIX)[1])
-                    if val > max_val: max_val = val
-                except: pass
-        return f"{PREFIX}{max_val + 1}"
-
-    def _calculate_token_sort_ratio(self, str1, str2):
-        if not str1 or not str2: return 0.0
-        def clean_token(s):
-            # Erlaubt auch Buchstaben in Zahlen-Kontext
-            s = re.sub(r'[^\w\s/]', '', str(s).lower())
-            return s
-        tokens1 = sorted(clean_token(str1).split())
-        tokens2 = sorted(clean_token(str2).split())
-        t1_str = " ".join(tokens1)
-        t2_str = " ".join(tokens2)
-        return SequenceMatcher(None, t1_str, t2_str).ratio()
+        return self._allocator().next(self._fetch_max_item_number)
+
+    def reserve_numbers(self, count):
+        """Reserviert einen Block Nummern für Bulk-Läufe (nicht genutzte Nummern bleiben als Lücke)."""
+        return self._allocator().reserve(count, self._fetch_max_item_number)
+
+    def _rebuild_match_index(self):
+        self._match_index = MatchIndex(self.existing_items_cache)
+
+    def _add_to_match_index(self, item):
+        # Ist der Index noch nicht gebaut, entsteht er später ohnehin aus dem Cache
+        if self._match_index is not None:
+            self._match_index.add(item.get('displayName'), item.get('number'))
 
     # =========================================================================
     # 🔥 VERBESSERTE MATCHING LOGIK (MIT STARTS-WITH & SUBSTRING BOOST) 🔥
     # =========================================================================
-    def get_match_info(self, new_name):
-        best_score = 0.0
-        best_name = "Kein Vergleichswert"
-        best_no = None
-        if not self.existing_items_cache: return best_name, 0.0, None
+    def get_match_info(self, new_name, exhaustive=None, score_cutoff=0.0):
+        return self.match_index.best_match(new_name, exhaustive, score_cutoff)
 
-        ignore_words = ["cannabis", "flos", "blüten", "extract", "gmbh", "kultivar", "strain"]
-        
-        # Stärkere Bereinigung für den Vergleich (Entfernt auch ' und - und .)
-        def remove_fillers(text):
-            t = text.lower()
-            for w in ignore_words: t = t.replace(w, "")
-            # Hier entfernen wir alles was KEIN Buchstabe/Zahl ist (also auch Apostrophe!)
-            return re.sub(r'[^\w\s]', '', t).strip()
-
-        clean_new_name = remove_fillers(new_name)
-        
-        for item in self.existing_items_cache:
-            existing_name = item['displayName']
-            clean_existing_name = remove_fillers(existing_name)
-            
-            # 1. Standard Mathe-Vergleich
-            score_normal = SequenceMatcher(None, clean_new_name, clean_existing_name).ratio()
-            score_token = self._calculate_token_sort_ratio(new_name, existing_name)
-            current_score = max(score_normal, score_token)
-            
-            # 2. TURBO BOOST: Startswith Check
-            # Da 'main_script' jetzt den Namen simuliert ("Name - Kultivar"), 
-            # muss dieser fast identisch mit dem BC Namen sein.
-            # Wir prüfen "Starts with" in beide Richtungen für maximale Sicherheit.
-            
-            # A) BC Name fängt mit Neuem Namen an (Klassiker)
-            if existing_name.lower().startswith(new_name.lower()):
-                if current_score < 0.95: current_score = 0.95
-            
-            # B) Neuer Name fängt mit BC Namen an (Falls BC kürzer ist)
-            elif new_name.lower().startswith(existing_name.lower()):
-                 if current_score < 0.95: current_score = 0.95
-
-            # C) Wenn wir Sonderzeichen ignorieren (remove_fillers), sind sie identisch?
-            # Das fängt "Casper's" vs "Casper’s" ab!
-            if clean_new_name == clean_existing_name:
-                 if current_score < 0.98: current_score = 0.99
-
-            # 3. Nummern-Check (Strafpunkt, wenn Zahlen nicht stimmen, z.B. 20/1 vs 22/1)
-            nums_new = re.findall(r'\d+/\d+', new_name)
-            nums_old = re.findall(r'\d+/\d+', existing_name)
-            if nums_new and nums_old:
-                if nums_new[0] != nums_old[0]:
-                    current_score = current_score - 0.5 
-            
-            # Besten Treffer speichern
-            if current_score > best_score:
-                best_score = current_score
-                best_name = existing_name
-                best_no = item['number']
-                
-        return best_name, best_score, best_no
+    def get_match_info_batch(self, names, workers=None, exhaustive=None, score_cutoff=0.0):
+        """Bewertet viele Namen parallel; Ergebnis in Eingabe-Reihenfolge wie get_match_info."""
+        names = list(names)
+        if workers is None: workers = MATCH_WORKERS
+        workers = max(1, workers)
+        if workers == 1 or len(names) < MATCH_BATCH_MIN_PARALLEL:
+            return [self.get_match_info(n, exhaustive, score_cutoff) for n in names]
 
-    def create_item_now(self, display_name, bild_pfad, scraped_data, use_default_image=False):
-        headers = { "Authorization": f"Bearer {self.token}", "Content-Type": "application/json" }
-        next_no = self.find_next_number()
-        
+        # Pool mit der konfigurierten Größe: kleinere Batches dürfen ihn nicht neu aufbauen lassen
+        chunksize = max(1, len(names) // (min(workers, len(names)) * 4))
+        pool = self._get_match_pool(workers)
+        return list(pool.map(_match_worker, [(n, exhaustive, score_cutoff) for n in names], chunksize=chunksize))
+
+    def _get_match_pool(self, workers):
+        """Prozess-Pool, der den Match-Index einmal (initializer) bekommt und über alle Batches lebt.
+        Wächst oder wechselt der Index (neue Artikel, Reload), wird der Pool neu aufgebaut."""
+        index = self.match_index
+        key = (id(index), len(index), workers)
+        with self._match_pool_lock:
+            if self._match_pool is not None and self._match_pool_key != key:
+                self._match_pool.shutdown(wait=True)
+                self._match_pool = None
+            if self._match_pool is None:
+                self._match_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_match_worker,
+                                                       initargs=(index,))
+                self._match_pool_key = key
+            return self._match_pool
+
+    def close_match_pool(self):
+        """Beendet die Worker-Prozesse von get_match_info_batch (am Ende eines Laufs aufrufen)."""
+        with self._match_pool_lock:
+            if self._match_pool is not None: self._match_pool.shutdown(wait=True)
+            self._match_pool, self._match_pool_key = None, None
+
+    def check_match_recall(self, names):
+        """Vergleicht Kandidaten-Modus und Vollvergleich: gleiche DUPLICATE/REVIEW Entscheidung?"""
+        mismatches = []
+        for name in names:
+            fast = self.get_match_info(name, exhaustive=False)
+            full = self.get_match_info(name, exhaustive=True)
+            if classify_match_score(fast[1]) != classify_match_score(full[1]):
+                mismatches.append((name, fast, full))
+        print(f"🔬 Recall-Check: {len(names) - len(mismatches)}/{len(names)} Entscheidungen identisch.")
+        return mismatches
+
+    def _build_item_payload(self, display_name, scraped_data, number):
         # 1. HERSTELLER LOGIK
         raw_hersteller = scraped_data.get('Hersteller', '').strip()
-        m_code = None
-        m_code = MANUFACTURER_CODE_MAPPING.get(raw_hersteller)
-        if not m_code:
-            for k, v in MANUFACTURER_CODE_MAPPING.items():
-                if k.lower() == raw_hersteller.lower(): m_code = v; break
-        if not m_code:
-             for k, v in MANUFACTURER_CODE_MAPPING.items():
-                if k.lower() in raw_hersteller.lower(): m_code = v; break
+        m_code = resolve_manufacturer_code(raw_hersteller)
         
         # 2. NAMENS-LOGIK
         p_name = scraped_data.get('Produktname', '').strip()
@@ -399,7 +857,7 @@ class BusinessCentralConnector:
 
         # 3. PAYLOAD
         payload = {
-            "number": next_no,
+            "number": number,
             "displayName": final_display_name[:100], 
             "baseUnitOfMeasureCode": UNIT_CODE,
             "blocked": False,
@@ -414,98 +872,165 @@ class BusinessCentralConnector:
 
         if m_code: payload["manufacturerCode"] = m_code
         if ITEM_CATEGORY: payload["itemCategoryCode"] = ITEM_CATEGORY
+        return payload
+
+    def _create_item_record(self, display_name, scraped_data, number=None):
+        """Stufe 1: Artikel in BC anlegen. Liefert die BC-Antwort (dict) oder None."""
+        payload = self._build_item_payload(display_name, scraped_data, number or self.find_next_number())
 
         # 4. API REQUEST
         api_base = f"https://api.businesscentral.dynamics.com/v2.0/{TENANT_ID}/{ENVIRONMENT}/api"
         custom_url = f"{api_base}/{API_PUBLISHER}/{API_GROUP}/{API_VERSION}/companies({self.company_id})/items"
 
         print(f"🚀 Sende Request an BC: {payload['displayName']}")
-        
+        r = self._post_item(custom_url, payload)
+        if r.status_code != 201:
+            print(f"   ❌ FEHLER {r.status_code}: {payload['displayName']}")
+            print(f"   📝 Rückmeldung von BC: {r.text}")
+            return None
+
+        item_data = r.json()
+        with self.cache_lock:
+            # Ist der Artikelstamm (noch) nicht geladen, reicht der Spiegel; er enthält den Artikel beim Laden
+            if self._items_cache is not None:
+                self._items_cache.append(item_data)
+                self._add_to_match_index(item_data)
+        self._get_mirror().upsert_items([item_data])
+        print(f"   ✅ Erstellt: {item_data.get('number')} - {item_data['displayName']}")
+        return item_data
+
+    def _process_item_image(self, item_id, bild_pfad, scraped_data, use_default_image=False):
+        """Stufe 2: Bild besorgen, Wasserzeichen entfernen, verkleinern und aus dem Speicher hochladen."""
+        if not item_id: return False
+        try:
+            # Entscheidung: Default oder Scraped?
+            if use_default_image:
+                print("      📸 Info: Nutze Default-Bild (Manuelle Auswahl im Dashboard)")
+                image = load_and_process(file_path=DEFAULT_IMAGE_PATH, remove_watermark=False)
+            else:
+                # Wasserzeichen nur bei echten Scrapes entfernen, nicht beim Default-Bild
+                image = load_and_process(lambda url, **kw: self.http.get(url, auth=False, **kw),
+                                         url=scraped_data.get('Bild Datei URL'), file_path=bild_pfad)
+        except Exception as img_err:
+            print(f"   ⚠️ Bild-Download fehlgeschlagen: {img_err}")
+            return False
+        if not image: return False
+        try:
+            return self._upload_image(item_id, image)
+        except Exception as upload_err:
+            print(f"   ⚠️ Bild-Upload Fehler: {upload_err}")
+            return False
+
+    def create_item_now(self, display_name, bild_pfad, scraped_data, use_default_image=False, number=None):
         try:
-            r = requests.post(custom_url, headers=headers, json=payload, timeout=20)
+            item_data = self._create_item_record(display_name, scraped_data, number)
+            if not item_data: return False
+            item_id = item_data.get('id') or item_data.get('systemId')
+            item_no = item_data.get('number') 
             
-            if r.status_code == 201:
-                item_data = r.json()
-                item_id = item_data.get('id') or item_data.get('systemId')
-                item_no = item_data.get('number') 
-                
-                self.existing_items_cache.append(item_data) 
-                print(f"   ✅ Erstellt: {item_no} - {item_data['displayName']}")
-                
-                # 5. BILD LOGIK (OPTIMIERT)
-                final_img_path = bild_pfad
-                temp_path = "temp_upload.jpg"
-                
-                # Entscheidung: Default oder Scraped?
-                if use_default_image:
-                    print("      📸 Info: Nutze Default-Bild (Manuelle Auswahl im Dashboard)")
-                    final_img_path = "Produkt_Bilder/default_flower.jpg"
-                elif (not final_img_path or not os.path.exists(final_img_path)) and 'Bild Datei URL' in scraped_data:
-                    try:
-                        img_url = scraped_data['Bild Datei URL']
-                        if img_url:
-                            full_url = img_url if img_url.startswith("http") else f"https://flowzz.com{img_url}"
-                            r_img = requests.get(full_url, stream=True, timeout=10)
-                            if r_img.status_code == 200:
-                                with open(temp_path, 'wb') as f:
-                                    for chunk in r_img.iter_content(1024): f.write(chunk)
-                                final_img_path = temp_path
-                    except Exception as img_err:
-                        print(f"   ⚠️ Bild-Download fehlgeschlagen: {img_err}")
-
-                if final_img_path and os.path.exists(final_img_path):
-                    try:
-                        # Wasserzeichen nur bei echten Scrapes entfernen, nicht beim Default-Bild
-                        if not use_default_image and 'remove_watermark_rectangle' in globals():
-                            remove_watermark_rectangle(final_img_path)
-                        
-                        if item_id:
-                            time.sleep(1) 
-                            self._upload_image(item_id, final_img_path)
-                    except Exception as upload_err:
-                        print(f"   ⚠️ Bild-Upload Fehler: {upload_err}")
-                
-                if final_img_path == temp_path and os.path.exists(temp_path):
-                    try: os.remove(temp_path)
-                    except: pass
-                
-                # 6. ATTRIBUTE & PARTNER SYNC
-                if item_no:
-                    self._process_and_link_attributes(item_no, scraped_data)
-                    
-                    # Hier triggern wir die Finclair-Tabelle (Setup 70450)
-                    print(f"      🔄 Aktiviere Partner-Sync via FIS MM...")
-                    self.link_item_to_availability_setup(item_no) 
-                
-                return True
+            # 5. BILD LOGIK (OPTIMIERT)
+            if item_id: time.sleep(1)
+            self._process_item_image(item_id, bild_pfad, scraped_data, use_default_image)
+            
+            # 6. ATTRIBUTE & PARTNER SYNC
+            if item_no:
+                self._process_and_link_attributes(item_no, scraped_data)
                 
-            else:
-                print(f"   ❌ FEHLER {r.status_code}: {payload['displayName']}")
-                print(f"   📝 Rückmeldung von BC: {r.text}")
-                return False
+                # Hier triggern wir die Finclair-Tabelle (Setup 70450)
+                print(f"      🔄 Aktiviere Partner-Sync via FIS MM...")
+                self.link_to_partner_sync(item_no)
+            
+            return True
 
         except Exception as e:
             print(f"   🔥 Schwerer Fehler bei API-Request: {e}")
             return False
 
-    def _upload_image(self, item_id, file_path):
+    def create_items_bulk(self, jobs, progress_callback=None, status_callback=None, max_in_flight=None):
+        """Pipeline-Import vieler Artikel.
+
+        jobs: Liste von Dicts mit display_name, bild_pfad, scraped_data und optional use_default_image.
+        Stufen (je eigener, begrenzter Pool): Artikel-POST -> Bild / Attribute / Partner-Sync parallel
+        -> status_callback(job, result) (z.B. Supabase-Status). progress_callback(done, total, result)
+        wird im aufrufenden Thread aufgerufen, sobald ein Artikel fertig ist. Ergebnisse in Eingabe-Reihenfolge.
+        """
+        jobs = list(jobs)
+        if not jobs: return []
+        # Firma und Attribute einmal im Haupt-Thread laden, nicht parallel aus mehreren Workern.
+        # Den Artikelstamm braucht der Import nicht (Nummern kommen aus dem Spiegel).
+        if not self._company_id: self._get_company_id()
+        if not self._company_name: self._find_company_name()
+        if self._attributes_cache is None: self._load_odata_attributes(self.force_full_sync)
+        # Nummern als Block vorab reservieren (in Eingabe-Reihenfolge), statt pro Artikel einzeln zu ziehen
+        numbers = self.reserve_numbers(len(jobs))
+        pools = {stage: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"bulk-{stage}")
+                 for stage, n in BULK_STAGE_WORKERS.items()}
+
+        def run_job(index, job):
+            result = {'index': index, 'ok': False, 'item_no': None, 'stages': {}, 'error': None}
+            try:
+                item_data = pools['post'].submit(self._create_item_record, job['display_name'], job['scraped_data'],
+                                                  numbers[index]).result()
+                if not item_data:
+                    result['error'] = "BC hat den Artikel abgelehnt"
+                    return result
+                item_id = item_data.get('id') or item_data.get('systemId')
+                item_no = item_data.get('number')
+                result['item_no'] = item_no
+                futures = {'image': pools['image'].submit(self._process_item_image, item_id, job.get('bild_pfad'),
+                                                          job['scraped_data'], job.get('use_default_image', False))}
+                if item_no:
+                    futures['attributes'] = pools['attributes'].submit(self._process_and_link_attributes, item_no, job['scraped_data'])
+                    futures['sync'] = pools['sync'].submit(self.link_to_partner_sync, item_no)
+                for stage, future in futures.items():
+                    try: result['stages'][stage] = future.result()
+                    except Exception as stage_err: result['stages'][stage] = f"Fehler: {stage_err}"
+                if status_callback:
+                    result['stages']['status'] = pools['status'].submit(status_callback, job, result).result()
+                result['ok'] = True
+            except Exception as e:
+                result['error'] = str(e)
+                print(f"   🔥 Schwerer Fehler bei Bulk-Import: {e}")
+            return result
+
+        results = [None] * len(jobs)
+        try:
+            with ThreadPoolExecutor(max_workers=max_in_flight or BULK_MAX_IN_FLIGHT) as coordinator:
+                futures = [coordinator.submit(run_job, i, job) for i, job in enumerate(jobs)]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    results[result['index']] = result
+                    if progress_callback: progress_callback(done, len(jobs), result)
+        finally:
+            for pool in pools.values(): pool.shutdown(wait=True)
+        return results
+
+    def _post_item(self, url, payload):
+        """POST mit Retry auf die nächste freie Nummer, falls BC die Nummer schon kennt (paralleler Import)."""
+        for attempt in range(NUMBER_COLLISION_RETRIES + 1):
+            r = self.http.post(url, json=payload, timeout=20)
+            if r.status_code == 201 or not is_duplicate_key_error(r) or attempt == NUMBER_COLLISION_RETRIES:
+                return r
+            # Ein anderer Prozess hat seit dem Seeding Artikel angelegt: neu vom Server seeden
+            new_no = self._allocator().reseed(lambda: self._fetch_max_item_number(refresh=True), payload["number"])
+            print(f"      ♻️ Nummer {payload['number']} bereits vergeben, neuer Versuch mit {new_no}")
+            payload["number"] = new_no
+        return r
+
+    def _upload_image(self, item_id, image_bytes):
         url = f"{self.base_url}/companies({self.company_id})/items({item_id})/picture/pictureContent"
-        headers = { "Authorization": f"Bearer {self.token}", "Content-Type": "application/octet-stream", "If-Match": "*" }
+        headers = { "Content-Type": "application/octet-stream", "If-Match": "*" }
         try:
-            with open(file_path, "rb") as f: requests.put(url, headers=headers, data=f.read())
-            print("      📸 Bild hochgeladen.")
+            r = self.http.put(url, headers=headers, data=image_bytes)
+            if r.status_code in [200, 204]:
+                print("      📸 Bild hochgeladen.")
+                return True
+            print(f"      ⚠️ Bild-Upload abgelehnt: {r.status_code}")
         except: pass
-
-    def _link_attribute_to_item(self, item_no, attr_id, val_id):
-        url = f"{self.custom_api_root}/companies({self.company_id})/itemAttributeMappings"
-        headers = { "Authorization": f"Bearer {self.token}", "Content-Type": "application/json" }
-        payload = { "itemNo": item_no, "attributeId": attr_id, "valueId": val_id }
-        r = requests.post(url, headers=headers, json=payload)
-        if r.status_code in [200, 201] or "already exists" in r.text:
-            return True
         return False
 
-    def _process_and_link_attributes(self, item_no, data):
+    def _collect_attribute_links(self, data):
+        """Ermittelt (bzw. legt an) alle Attribut-/Wert-IDs eines gescrapten Datensatzes."""
         static_mapping = {
             'THC': 'THC in Prozent', 'CBD': 'CBD in Prozent', 'Hersteller': 'Hersteller',
             'Herkunft': 'Herkunftsland', 'Sorte': 'Sorte', 'Bestrahlung': 'Bestrahlung',
@@ -516,7 +1041,7 @@ class BusinessCentralConnector:
             'Med. Wirkung': 'Medizinische Wirkung', 'Kategorie Effekt': 'Kategorie Effekt' 
         }
         
-        print(f"      🔗 Verknüpfe Attribute...")
+        links = []
         for scraper_key, bc_name in static_mapping.items():
             raw_val = data.get(scraper_key, "").strip()
             if not raw_val: continue
@@ -524,7 +1049,7 @@ class BusinessCentralConnector:
             if bc_name in self.attributes_cache:
                 attr_id = self.attributes_cache[bc_name]['id']
                 val_id = self._ensure_value_exists(bc_name, attr_id, raw_val)
-                if val_id: self._link_attribute_to_item(item_no, attr_id, val_id)
+                if val_id: links.append((attr_id, val_id))
 
         for scraper_base, bc_name in list_mapping.items():
             if bc_name not in self.attributes_cache: continue 
@@ -534,52 +1059,97 @@ class BusinessCentralConnector:
                 raw_val = data.get(key, "").strip()
                 if raw_val:
                     val_id = self._ensure_value_exists(bc_name, attr_id, raw_val)
-                    if val_id: self._link_attribute_to_item(item_no, attr_id, val_id)
+                    if val_id: links.append((attr_id, val_id))
+        return links
+
+    def _process_and_link_attributes(self, item_no, data):
+        print(f"      🔗 Verknüpfe Attribute...")
+        return self.link_attributes_bulk([(item_no, data)])
+
+    def link_attributes_bulk(self, items, chunk_size=None):
+        """Verknüpft die Attribute vieler Artikel über $batch. items: Liste von (item_no, scraped_data)."""
+        links = []
+        for item_no, data in items:
+            links.extend((item_no, attr_id, val_id) for attr_id, val_id in self._collect_attribute_links(data))
+        if not links: return {'linked': 0, 'failed': 0}
+
+        chunk_size = chunk_size or BATCH_CHANGESET_SIZE
+        url = f"companies({self.company_id})/{API_ENTITY}"
+        ops = [{"method": "POST", "url": url, "body": {"itemNo": no, "attributeId": a_id, "valueId": v_id}}
+               for no, a_id, v_id in links]
+        results = self.http.batch(self.custom_api_root, ops, chunk_size)
+
+        linked, failed = 0, 0
+        for (no, a_id, v_id), res in zip(links, results):
+            if res['status'] in [200, 201] or "already exists" in json.dumps(res['body']):
+                linked += 1
+            else:
+                failed += 1
+                print(f"      ⚠️ Attribut-Link fehlgeschlagen ({no}, {a_id}): {res['status']}")
+        n_calls = (len(ops) + chunk_size - 1) // chunk_size
+        print(f"      🔗 {linked} Attribut-Links gesetzt ({len(ops)} Requests in {n_calls} Batch-Aufruf(en)).")
+        return {'linked': linked, 'failed': failed}
 
     def get_existing_attribute_values(self, item_no):
         """Holt alle bereits verknüpften Attribut-IDs für einen Artikel."""
         url = f"{self.custom_api_root}/companies({self.company_id})/itemAttributeMappings?$filter=itemNo eq '{item_no}'"
-        headers = {"Authorization": f"Bearer {self.token}"}
         try:
-            r = requests.get(url, headers=headers)
+            r = self.http.get(url)
             if r.status_code == 200:
                 return {item['attributeId'] for item in r.json().get('value', [])}
         except Exception as e:
             print(f"Fehler beim Laden existierender Attribute: {e}")
         return set()
 
+    def request_stats(self):
+        """Anzahl Requests pro BC-Endpunkt seit Start des Connectors."""
+        return self.http.stats()
+
     def has_image(self, item_id):
         """Prüft, ob der Artikel bereits ein Bild hat."""
         url = f"{self.base_url}/companies({self.company_id})/items({item_id})/picture"
-        headers = {"Authorization": f"Bearer {self.token}"}
-        r = requests.get(url, headers=headers)
+        r = self.http.get(url)
         if r.status_code == 200:
             val = r.json().get('value', [])
             if val and val[0].get('width', 0) > 0:
                 return True
         return False                
 
-    def link_to_partner_sync(self, item_no):
+    def _post_partner_sync(self, item_no, client_id):
         url = f"{self.custom_api_root}/companies({self.company_id})/itemSyncs"
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
+        payload = {
+            "clientId": client_id,
+            "itemNo": item_no,
+            "accepted": False
         }
-        
-        for client_id in SYNC_CLIENTS:
-            payload = {
-                "clientId": client_id,
-                "itemNo": item_no,
-                "accepted": False
-            }
-            try:
-                r = requests.post(url, headers=headers, json=payload, timeout=10)
-                if r.status_code in [200, 201]:
-                    print(f"✅ Sync: {item_no} -> {client_id}")
-                elif "already exists" in r.text.lower():
-                    # Das printen wir nur, wenn wir wirklich neugierig sind
-                    pass 
-                else:
-                    print(f"⚠️ Fehler bei {client_id}: {r.status_code}")
-            except Exception as e:
-                print(f"🔥 Fehler beim Sync-Request für {client_id}: {e}")
\ No newline at end of file
+        try:
+            r = self.http.post(url, json=payload, timeout=10)
+            if r.status_code in [200, 201]:
+                return SYNC_CREATED
+            elif "already exists" in r.text.lower():
+                return SYNC_EXISTS
+            else:
+                print(f"⚠️ Fehler bei {client_id} ({item_no}): {r.status_code}")
+        except Exception as e:
+            print(f"🔥 Fehler beim Sync-Request für {client_id} ({item_no}): {e}")
+        return SYNC_FAILED
+
+    def link_to_partner_sync(self, item_no):
+        """Meldet einen Artikel bei allen SYNC_CLIENTS an. Ergebnis: {client_id: created/exists/failed}."""
+        return self.link_to_partner_sync_bulk([item_no])[item_no]
+
+    def link_to_partner_sync_bulk(self, item_nos, max_workers=None):
+        """Wie link_to_partner_sync für viele Artikel, alle Posts parallel über einen begrenzten Thread-Pool."""
+        item_nos = list(dict.fromkeys(item_nos))
+        results = {no: dict.fromkeys(SYNC_CLIENTS) for no in item_nos}
+        jobs = [(no, client_id) for no in item_nos for client_id in SYNC_CLIENTS]
+        with ThreadPoolExecutor(max_workers=max_workers or SYNC_MAX_WORKERS) as pool:
+            futures = {pool.submit(self._post_partner_sync, no, client_id): (no, client_id) for no, client_id in jobs}
+            for future in as_completed(futures):
+                no, client_id = futures[future]
+                results[no][client_id] = future.result()
+
+        for no in item_nos:
+            states = list(results[no].values())
+            print(f"✅ Sync {no}: {states.count(SYNC_CREATED)} neu, {states.count(SYNC_EXISTS)} vorhanden, {states.count(SYNC_FAILED)} Fehler")
+        return results
@@ -0,0 +1,75 @@
+import os
+import json
+import threading
+from datetime import datetime, timezone, timedelta
+
+# ==========================================
+# CHECKPOINT FÜR DEN KATALOG-CRAWL
+# ==========================================
+# Hält fest, welche Übersichtsseiten schon gelesen und welche Produkt-Links schon
+# nach Supabase geschrieben wurden. Ein abgebrochener Lauf macht dort weiter; ein
+# erfolgreicher Lauf löscht die Datei, der nächste Nachtlauf beginnt von vorn.
+
+CHECKPOINT_PATH = os.getenv("CRAWL_CHECKPOINT", ".crawl_checkpoint.json")
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CRAWL_CHECKPOINT_MAX_AGE_HOURS", "20"))
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+class CrawlCheckpoint:
+    def __init__(self, path=CHECKPOINT_PATH, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+        self.path = path
+        self.lock = threading.Lock()
+        self.started_at = utc_now().isoformat()
+        self.pages_done = set()
+        self.links = {}            # URL -> Seite (Reihenfolge = Fundreihenfolge)
+        self.links_done = set()
+        self.crawl_finished = False
+        self.resumed = False
+        try:
+            with open(path, encoding="utf-8") as f: data = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            if utc_now() - datetime.fromisoformat(data["started_at"]) > timedelta(hours=max_age_hours): return
+        except (KeyError, TypeError, ValueError):
+            return
+        self.started_at = data["started_at"]
+        self.pages_done = set(data.get("pages_done", []))
+        self.links = dict(data.get("links", {}))
+        self.links_done = set(data.get("links_done", []))
+        self.crawl_finished = bool(data.get("crawl_finished"))
+        self.resumed = True
+
+    def add_page(self, page, links):
+        with self.lock:
+            self.pages_done.add(page)
+            for link in links: self.links.setdefault(link, page)
+        self.save()
+
+    def mark_crawl_finished(self):
+        with self.lock: self.crawl_finished = True
+        self.save()
+
+    def mark_links_done(self, links):
+        with self.lock: self.links_done.update(links)
+        self.save()
+
+    def save(self):
+        with self.lock:
+            data = {
+                "started_at": self.started_at,
+                "pages_done": sorted(self.pages_done),
+                "links": self.links,
+                "links_done": sorted(self.links_done),
+                "crawl_finished": self.crawl_finished,
+            }
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(data, f)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        """Lauf erfolgreich beendet: Checkpoint verwerfen."""
+        with self.lock:
+            try: os.remove(self.path)
+            except OSError: pass
@@ -55,20 +55,107 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- DATA HELPERS ---
-def fetch_data():
-    res = supabase.table("import_queue_duplicate").select("*").order("id", desc=True).execute()
-    return pd.DataFrame(res.data)
+PAGE_SIZE = 50
+OPEN_STATUSES = ['READY', 'REVIEW', 'DUPLICATE']
+# Nur die Kartenfelder, die JSON-Felder direkt aus scraped_data (kein komplettes JSON pro Rerun)
+CARD_COLUMNS = ('id, status, produktname, match_info, '
+                'bild_url:scraped_data->>"Bild Datei URL", bild_datei:scraped_data->>"Bild Datei", '
+                'hersteller:scraped_data->>Hersteller, kultivar:scraped_data->>Kultivar')
+
+CARD_FIELDS = ['id', 'status', 'produktname', 'match_info', 'bild_url', 'bild_datei', 'hersteller', 'kultivar']
+QUEUE_SYNC_PAGE = 1000
+DELTA_OVERLAP = pd.Timedelta(seconds=30)   # Puffer für Transaktionen, die mit älterem updated_at committen
+
+def _fetch_all(build_query):
+    """Alle Zeilen einer Abfrage, seitenweise per range(). build_query() liefert jeweils eine frische Abfrage."""
+    rows, start = [], 0
+    while True:
+        res = build_query().range(start, start + QUEUE_SYNC_PAGE - 1).execute()
+        rows.extend(res.data)
+        if len(res.data) < QUEUE_SYNC_PAGE: return rows
+        start += QUEUE_SYNC_PAGE
+
+def _queue_query(columns):
+    return supabase.table("import_queue_duplicate").select(columns)
+
+def _missing_column(error, column):
+    """PostgREST meldet eine nicht vorhandene Spalte (Postgres 42703 undefined_column)."""
+    return getattr(error, 'code', None) == "42703" and column in str(error)
+
+def sync_queue():
+    """Kartenfelder der ganzen Queue in st.session_state; pro Rerun kommt nur das Delta dazu.
+    Wasserzeichen ist updated_at (siehe sql/import_queue_updated_at.sql), ohne die Spalte die höchste id."""
+    state = st.session_state
+    if "queue_df" not in state:
+        try:
+            rows = _fetch_all(lambda: _queue_query(f"{CARD_COLUMNS}, updated_at").order("id"))
+            state.queue_mode = "updated_at"
+        except Exception as e:
+            # Nur wenn die Spalte updated_at noch fehlt: neue Zeilen per id nachladen. Netzwerk- und
+            # andere Fehler gehen durch, sonst bliebe die Session dauerhaft im id-Modus.
+            if not _missing_column(e, "updated_at"): raise
+            rows = _fetch_all(lambda: _queue_query(CARD_COLUMNS).order("id"))
+            state.queue_mode = "id"
+        state.queue_df = pd.DataFrame(rows, columns=CARD_FIELDS + (["updated_at"] if state.queue_mode == "updated_at" else []))
+    else:
+        df = state.queue_df
+        if state.queue_mode == "updated_at":
+            since = (state.queue_watermark - DELTA_OVERLAP).isoformat()
+            rows = _fetch_all(lambda: _queue_query(f"{CARD_COLUMNS}, updated_at").gte("updated_at", since).order("updated_at"))
+        else:
+            rows = _fetch_all(lambda: _queue_query(CARD_COLUMNS).gt("id", state.queue_watermark).order("id"))
+        if rows:
+            delta = pd.DataFrame(rows, columns=df.columns)
+            state.queue_df = pd.concat([df[~df['id'].isin(delta['id'])], delta], ignore_index=True)
+    df = state.queue_df = state.queue_df.sort_values("id", ascending=False, ignore_index=True)
+    if df.empty:
+        state.queue_watermark = pd.Timestamp(0, tz="UTC") if state.queue_mode == "updated_at" else 0
+    elif state.queue_mode == "updated_at":
+        state.queue_watermark = pd.to_datetime(df['updated_at'], utc=True).max()
+    else:
+        state.queue_watermark = int(df['id'].max())
+    return df
+
+def reset_queue():
+    """Nächster sync_queue() lädt komplett neu (z.B. nach Löschungen in der Datenbank)."""
+    for key in ("queue_df", "queue_mode", "queue_watermark"): st.session_state.pop(key, None)
+
+def set_local_status(ids, new_status):
+    """Statusänderung sofort in der lokalen Queue, ohne auf das nächste Delta zu warten."""
+    df = st.session_state.get("queue_df")
+    if df is not None: df.loc[df['id'].isin(list(ids)), 'status'] = new_status
+
+def fetch_data(queue, statuses, page=0, page_size=PAGE_SIZE):
+    """Eine Seite Karten aus der lokalen Queue. Liefert (DataFrame, Gesamtzahl)."""
+    view = queue[queue['status'].isin(list(statuses))]
+    start = page * page_size
+    return view.iloc[start:start + page_size], len(view)
+
+def count_open(queue):
+    return int(queue['status'].isin(OPEN_STATUSES).sum())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_details(db_id):
+    """Komplettes scraped_data eines Eintrags (erst wenn die Details geöffnet werden)."""
+    res = supabase.table("import_queue_duplicate").select("scraped_data").eq("id", db_id).execute()
+    return res.data[0]['scraped_data'] if res.data else {}
+
+def fetch_scraped_data(ids):
+    """scraped_data für mehrere Einträge in einer Abfrage (Import)."""
+    if not ids: return {}
+    res = supabase.table("import_queue_duplicate").select("id, scraped_data").in_("id", list(ids)).execute()
+    return {r['id']: r['scraped_data'] or {} for r in res.data}
 
 def update_status(db_id, new_status):
+    # Kein Session-State hier: läuft beim Bulk-Import im Worker-Thread, danach set_local_status()
     supabase.table("import_queue_duplicate").update({"status": new_status}).eq("id", db_id).execute()
 
 # --- SIDEBAR ---
-df = fetch_data()
+queue_df = sync_queue()
 
 with st.sidebar:
     st.title("🌿 Admin Panel")
-    if not df.empty:
-        st.metric("Offen", len(df[df['status'].isin(['READY', 'REVIEW', 'DUPLICATE'])]))
+    st.metric("Offen", count_open(queue_df))
     
     st.divider()
     show_ignored = st.checkbox("🗑️ Papierkorb zeigen")
@@ -77,6 +164,9 @@ with st.sidebar:
     if show_ignored: status_options = ['IGNORED']
     
     filter_sel = st.multiselect("Filter:", status_options, default=status_options[:3])
+    if st.button("🔄 Neu laden"):
+        reset_queue()
+        st.rerun()
 
     st.divider()
     if st.button("✅ Alle Sichtbaren anwählen"):
@@ -105,12 +195,12 @@ with st.sidebar:
                         scraped_data = scrape_full_details(driver, flowzz_url)
                         scraped_data = apply_pre_cleaning(scraped_data)
                         
-                        # 2. BC Verbindung herstellen
+                        # 2. BC Verbindung herstellen (lädt den Artikelstamm nicht mehr komplett)
                         bc = BusinessCentralConnector()
                         bc.authenticate()
                         
-                        # 3. Artikel in BC suchen
-                        item_data = next((i for i in bc.existing_items_cache if i['number'] == target_item_no), None)
+                        # 3. Artikel in BC suchen (Server-Filter auf die Nummer)
+                        item_data = bc.get_item_by_number(target_item_no)
                         
                         if not item_data:
                             st.error(f"Fehler: Artikel {target_item_no} nicht in BC gefunden!")
@@ -126,7 +216,7 @@ with st.sidebar:
                                 st.warning("Kein Bild in BC gefunden. Lade hoch...")
                                 img_path = scraped_data.get('Bild Datei')
                                 if img_path and os.path.exists(img_path):
-                                    bc._upload_image(item_data['id'], img_path)
+                                    bc._process_item_image(item_data['id'], img_path, scraped_data)
                                     st.success("✅ Bild wurde erfolgreich nachgepflegt!")
                                 else:
                                     st.error("❌ Kein lokaler Bild-Pfad verfügbar.")
@@ -144,34 +234,42 @@ with st.sidebar:
 # --- MAIN ---
 st.title("Flowzz Live Import")
 
-if df.empty:
-    st.info("Datenbank ist leer. Starte den Scraper.")
+page = max(1, st.session_state.get("queue_page", 1))
+df_view, total = fetch_data(queue_df, filter_sel, page - 1)
+max_page = max(1, -(-total // PAGE_SIZE))
+if page > max_page:
+    # Filter hat sich geändert und die Seite gibt es nicht mehr
+    st.session_state.queue_page = page = max_page
+    df_view, total = fetch_data(queue_df, filter_sel, page - 1)
+
+if total == 0:
+    st.info("Keine Einträge für diesen Filter. Starte den Scraper.")
 else:
-    df_view = df[df['status'].isin(filter_sel)].copy()
-    st.session_state.visible_ids = df_view.index.tolist()
+    if max_page > 1:
+        st.number_input(f"Seite (von {max_page}, {total} Einträge)", min_value=1, max_value=max_page, key="queue_page")
+    st.session_state.visible_ids = df_view['id'].tolist()
 
-    selected_indices = []
+    selected_ids = []
 
-    for index, row in df_view.iterrows():
-        sd = row['scraped_data']
+    for _, row in df_view.iterrows():
         st.markdown(f'<div class="card">', unsafe_allow_html=True)
         c1, c2, c3, c4 = st.columns([0.4, 1.2, 4, 2])
         
         with c1:
-            key = f"sel_{index}"
+            key = f"sel_{row['id']}"
             if key not in st.session_state: st.session_state[key] = (row['status'] == 'READY')
             if st.checkbox("", key=key, label_visibility="collapsed"):
-                selected_indices.append(index)
+                selected_ids.append(int(row['id']))
         
         with c2:
             # --- CLOUD FIX: Bild-URL statt lokaler Pfad ---
-            bild_url = sd.get('Bild Datei URL')
+            bild_url = row.get('bild_url')
             if bild_url:
                 full_url = bild_url if bild_url.startswith("http") else f"https://flowzz.com{bild_url}"
                 st.image(full_url, width=80)
-            elif sd.get('Bild Datei') and os.path.exists(str(sd.get('Bild Datei'))):
+            elif row.get('bild_datei') and os.path.exists(str(row.get('bild_datei'))):
                 # Fallback für lokales Testen
-                st.image(sd.get('Bild Datei'), width=80)
+                st.image(row.get('bild_datei'), width=80)
             else:
                 st.caption("Kein Bild")
             # --- NEU: Checkbox für die Auswahl des Standard-Bildes ---
@@ -180,7 +278,7 @@ else:
         with c3:
             st.markdown(f"<span class='status-badge {row['status']}'>{row['status']}</span>", unsafe_allow_html=True)
             st.markdown(f"**{row['produktname']}**")
-            st.caption(f"🏗️ {sd.get('Hersteller')} | 🧬 {sd.get('Kultivar')}")
+            st.caption(f"🏗️ {row.get('hersteller')} | 🧬 {row.get('kultivar')}")
             
             if row['status'] in ['DUPLICATE', 'REVIEW'] and row.get('match_info'):
                 color = "#ef6c00" if row['status'] == 'DUPLICATE' else "#1976d2"
@@ -192,7 +290,9 @@ else:
         
         with c4:
             with st.expander("Details"):
-                st.json(sd)
+                # Expander-Inhalt läuft bei jedem Rerun, daher erst auf Wunsch laden
+                if st.toggle("Daten laden", key=f"det_{row['id']}"):
+                    st.json(fetch_details(row['id']))
         st.markdown('</div>', unsafe_allow_html=True)
 
     # --- AKTIONEN ---
@@ -200,7 +300,7 @@ else:
     col_a, col_b = st.columns(2)
     
     if col_a.button("🚀 IMPORT STARTEN", type="primary", use_container_width=True):
-        if not selected_indices:
+        if not selected_ids:
             st.warning("Bitte wähle zuerst Produkte aus!")
         else:
             bc = BusinessCentralConnector()
@@ -215,40 +315,50 @@ else:
             p = st.progress(0)
             status_text = st.empty()
             
-            for i, idx in enumerate(selected_indices):
-                item = df_view.loc[idx]
-                sd = item['scraped_data']
+            jobs = []
+            full_data = fetch_scraped_data(selected_ids)
+            for db_id in selected_ids:
+                sd = full_data.get(db_id, {})
                 
                 clean_p_name = sd.get('Produktname', '').strip()
                 p_kultivar = sd.get('Kultivar', '').strip()
                 final_name = f"{clean_p_name} - {p_kultivar}" if p_kultivar else clean_p_name
-                
-                status_text.info(f"⏳ Übertrage ({i+1}/{len(selected_indices)}): {final_name}")
-                
-                try:
-                    use_default = st.session_state.get(f"use_def_{item['id']}", False)
-                    success = bc.create_item_now(final_name, sd.get('Bild Datei'), sd, use_default_image=use_default)
-                    
-                    if success:
-                        update_status(item['id'], 'PROCESSED')
-                        st.toast(f"✅ {final_name} erfolgreich!")
-                    else:
-                        st.error(f"⚠️ BC hat {final_name} abgelehnt.")
-                
-                except Exception as e:
-                    st.error(f"🔥 Fehler bei {final_name}: {e}")
-                
-                p.progress((i + 1) / len(selected_indices))
+                jobs.append({
+                    'queue_id': db_id,
+                    'display_name': final_name,
+                    'bild_pfad': sd.get('Bild Datei'),
+                    'scraped_data': sd,
+                    'use_default_image': st.session_state.get(f"use_def_{db_id}", False),
+                })
+
+            # Supabase-Status als letzte Pipeline-Stufe (läuft im Worker, sobald BC fertig ist)
+            def mark_processed(job, result):
+                update_status(job['queue_id'], 'PROCESSED')
+                return True
+
+            # Fortschritt kommt im Streamlit-Thread an, daher dürfen hier st-Aufrufe stehen
+            def on_progress(done, total, result):
+                job = jobs[result['index']]
+                if result['ok']:
+                    set_local_status([job['queue_id']], 'PROCESSED')
+                    st.toast(f"✅ {job['display_name']} erfolgreich!")
+                else:
+                    st.error(f"⚠️ {job['display_name']}: {result['error']}")
+                status_text.info(f"⏳ Übertragen ({done}/{total}): {job['display_name']}")
+                p.progress(done / total)
+
+            status_text.info(f"⏳ Übertrage {len(jobs)} Artikel...")
+            bc.create_items_bulk(jobs, progress_callback=on_progress, status_callback=mark_processed)
             
             status_text.success("🏁 Alle ausgewählten Importe abgeschlossen!")
             time.sleep(2)
             st.rerun()
 
     if col_b.button("🗑️ ALS IGNORIERT MARKIEREN", use_container_width=True):
-        if not selected_indices:
+        if not selected_ids:
             st.warning("Bitte wähle zuerst Produkte aus!")
         else:
-            for idx in selected_indices:
-                item = df_view.loc[idx]
-                update_status(item['id'], 'IGNORED')
+            for db_id in selected_ids:
+                update_status(db_id, 'IGNORED')
+            set_local_status(selected_ids, 'IGNORED')
             st.rerun()
\ No newline at end of file
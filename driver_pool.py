@@ -0,0 +1,101 @@
+import queue
+import threading
+
+# ==========================================
+# SELENIUM WORKER-POOL
+# ==========================================
+# N Threads mit je einem eigenen Chrome. Jeder Worker startet seinen Treiber nach
+# recycle_after Seiten neu (Chrome wächst sonst im Speicher) und ersetzt abgestürzte
+# Treiber. Ergebnisse kommen in Fertigstellungs-Reihenfolge zurück.
+
+DEFAULT_WORKERS       = 3
+DEFAULT_RECYCLE_AFTER = 50
+TASK_ATTEMPTS         = 2   # Ein Versuch + ein Versuch mit frischem Treiber
+
+_STOP = object()
+
+class DriverPool:
+    def __init__(self, driver_factory, func, workers=DEFAULT_WORKERS, recycle_after=DEFAULT_RECYCLE_AFTER):
+        """func(driver, item) erledigt eine Aufgabe mit dem Treiber des Workers."""
+        self.driver_factory = driver_factory
+        self.func = func
+        self.workers = max(1, workers)
+        self.recycle_after = recycle_after
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.factory_lock = threading.Lock()   # ChromeDriverManager.install() ist nicht thread-sicher
+        self.threads = []
+        self.stats = {"pages": 0, "recycled": 0, "restarts": 0, "failed": 0}
+        self.stats_lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _count(self, key):
+        with self.stats_lock: self.stats[key] += 1
+
+    def _new_driver(self):
+        with self.factory_lock:
+            return self.driver_factory()
+
+    @staticmethod
+    def _quit(driver):
+        if driver is None: return
+        try: driver.quit()
+        except Exception: pass
+
+    def _worker(self):
+        driver, pages = None, 0
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is _STOP: break
+                if driver is not None and self.recycle_after and pages >= self.recycle_after:
+                    self._quit(driver)
+                    driver, pages = None, 0
+                    self._count("recycled")
+                result, error = None, None
+                for attempt in range(TASK_ATTEMPTS):
+                    try:
+                        if driver is None: driver = self._new_driver()
+                        result, error = self.func(driver, task), None
+                        break
+                    except Exception as e:
+                        # Treiber gilt als kaputt: wegwerfen und mit frischem Chrome nochmal
+                        error = e
+                        self._quit(driver)
+                        driver, pages = None, 0
+                        self._count("restarts")
+                pages += 1
+                self._count("pages")
+                if error is not None: self._count("failed")
+                self.results.put((task, result, error))
+        finally:
+            self._quit(driver)
+
+    def start(self):
+        for i in range(self.workers - len(self.threads)):
+            t = threading.Thread(target=self._worker, name=f"scrape-{len(self.threads)}", daemon=True)
+            t.start()
+            self.threads.append(t)
+        return self
+
+    def imap_unordered(self, items):
+        """Verteilt items auf die Worker. Liefert (item, ergebnis, fehler), sobald ein Item fertig ist."""
+        items = list(items)
+        if not self.threads: self.start()
+        for item in items: self.tasks.put(item)
+        for _ in items:
+            yield self.results.get()
+
+    def shutdown(self):
+        """Stoppt alle Worker sauber (offene Aufgaben werden verworfen) und beendet ihre Browser."""
+        while True:
+            try: self.tasks.get_nowait()
+            except queue.Empty: break
+        for _ in self.threads: self.tasks.put(_STOP)
+        for t in self.threads: t.join()
+        self.threads = []
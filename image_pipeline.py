@@ -0,0 +1,236 @@
+import os
+import json
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+# ==========================================
+# BILD-PIPELINE (IM SPEICHER)
+# ==========================================
+# Download -> Wasserzeichen übermalen -> auf BC-Maximalgröße verkleinern -> einmal als JPEG
+# kodieren. Alles in Puffern, keine geteilten Temp-Dateien (parallele Importe).
+
+IMAGE_BASE_URL  = "https://flowzz.com"
+IMAGE_MAX_SIZE  = int(os.getenv("BC_IMAGE_MAX_SIZE", "1200"))   # längste Kante in Pixel
+IMAGE_QUALITY   = 95
+WATERMARK_BOX   = (380, 160)   # Breite, Höhe des Flowzz-Logos unten rechts
+DOWNLOAD_TIMEOUT = (10, 45)
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", ".image_cache")
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "500"))
+
+def absolute_image_url(url):
+    if not url: return None
+    return url if url.startswith("http") else f"{IMAGE_BASE_URL}{url}"
+
+def http_validators(response):
+    """ETag / Last-Modified einer Antwort (für spätere bedingte Requests)."""
+    found = {}
+    for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified")):
+        if response.headers.get(header): found[key] = response.headers[header]
+    return found
+
+def conditional_headers(validators):
+    headers = {}
+    if (validators or {}).get("etag"): headers["If-None-Match"] = validators["etag"]
+    if (validators or {}).get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def fetch_image(get, url, timeout=DOWNLOAD_TIMEOUT):
+    """Lädt ein Bild in den Speicher. get ist z.B. requests.Session.get. Liefert (bytes, validators) oder (None, {})."""
+    url = absolute_image_url(url)
+    if not url: return None, {}
+    r = get(url, timeout=timeout)
+    if r.status_code != 200 or not r.content: return None, {}
+    return r.content, http_validators(r)
+
+def paint_watermark(img):
+    # Koordinaten für das Rechteck unten rechts (Flowzz Logo), in Originalpixeln
+    width, height = img.size
+    rect_width, rect_height = WATERMARK_BOX
+    ImageDraw.Draw(img).rectangle([width - rect_width, height - rect_height, width, height], fill=(255, 255, 255), outline=None)
+
+def process_image(raw, remove_watermark=True, max_size=IMAGE_MAX_SIZE, quality=IMAGE_QUALITY):
+    """Rohdaten -> upload-fertiges JPEG (bytes). Genau ein Dekodieren und ein Kodieren."""
+    with Image.open(BytesIO(raw)) as src:
+        # Schon upload-fertig (z.B. vom Scraper gespeichert): nicht erneut kodieren
+        if not remove_watermark and src.format == "JPEG" and src.mode == "RGB" and not (max_size and max(src.size) > max_size):
+            return raw
+        img = src.convert("RGB")
+    if remove_watermark: paint_watermark(img)
+    if max_size and max(img.size) > max_size:
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+# ==========================================
+# CACHE FÜR BEARBEITETE BILDER
+# ==========================================
+# Speichert upload-fertige Bytes, adressiert über den Inhalt (sha256 der Rohdaten + Variante).
+# index.json ordnet URL -> Blob zu, damit bekannte URLs ohne Download bedient werden; gleiche
+# Bilder unter anderer URL/anderem Produktnamen landen im selben Blob. LRU über die Größe.
+
+class ImageCache:
+    def __init__(self, folder=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.folder = folder
+        self.blob_dir = os.path.join(folder, "blobs")
+        self.index_path = os.path.join(folder, "index.json")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        try:
+            with open(self.index_path, encoding="utf-8") as f: self.urls = json.load(f)
+        except (OSError, ValueError):
+            self.urls = {}
+        # LRU-Reihenfolge aus den Zugriffszeiten der Blobs (älteste zuerst)
+        blobs = []
+        for name in os.listdir(self.blob_dir):
+            st = os.stat(os.path.join(self.blob_dir, name))
+            blobs.append((st.st_mtime, name, st.st_size))
+        self.blobs = OrderedDict((name, size) for _, name, size in sorted(blobs))
+        self.total = sum(self.blobs.values())
+        # Index-Einträge ohne Blob (z.B. von Hand gelöscht) gleich verwerfen
+        self._forget({name for variants in self.urls.values() for key, name in variants.items()
+                      if key != "_validators" and name not in self.blobs})
+
+    @staticmethod
+    def variant(remove_watermark, max_size=IMAGE_MAX_SIZE):
+        return f"{'wm' if remove_watermark else 'raw'}{max_size or 0}q{IMAGE_QUALITY}"
+
+    def _blob_path(self, name):
+        return os.path.join(self.blob_dir, name)
+
+    def _read(self, name):
+        # Aufrufer hält den Lock
+        if name not in self.blobs: return None
+        try:
+            with open(self._blob_path(name), "rb") as f: data = f.read()
+        except OSError:
+            self.total -= self.blobs.pop(name)
+            self._forget({name})
+            return None
+        self.blobs.move_to_end(name)
+        try: os.utime(self._blob_path(name))
+        except OSError: pass
+        return data
+
+    def _forget(self, names):
+        """URL-Zuordnungen auf entfernte Blobs löschen; URLs ohne Variante fliegen samt Validatoren raus.
+        Aufrufer hält den Lock. Liefert True, wenn sich der Index geändert hat."""
+        if not names: return False
+        changed = False
+        for url in list(self.urls):
+            variants = self.urls[url]
+            for key in [k for k, v in variants.items() if k != "_validators" and v in names]:
+                del variants[key]
+                changed = True
+            if not any(k != "_validators" for k in variants):
+                del self.urls[url]
+                changed = True
+        return changed
+
+    def _write(self, name, data):
+        """Blob ablegen und älteste Blobs verdrängen. Aufrufer hält den Lock; True, wenn der Index geändert wurde."""
+        tmp = self._blob_path(f"{name}.tmp{threading.get_ident()}")
+        with open(tmp, "wb") as f: f.write(data)
+        os.replace(tmp, self._blob_path(name))
+        if name in self.blobs: self.total -= self.blobs[name]
+        self.blobs[name] = len(data)
+        self.blobs.move_to_end(name)
+        self.total += len(data)
+        evicted = set()
+        while self.total > self.max_bytes and len(self.blobs) > 1:
+            old, size = self.blobs.popitem(last=False)
+            self.total -= size
+            self.counters["evictions"] += 1
+            evicted.add(old)
+            try: os.remove(self._blob_path(old))
+            except OSError: pass
+        return self._forget(evicted)
+
+    def _save_index(self):
+        tmp = f"{self.index_path}.tmp{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(self.urls, f)
+        os.replace(tmp, self.index_path)
+
+    def get(self, url, remove_watermark=True):
+        """Bearbeitete Bytes zu einer URL, falls im Cache (zählt Treffer/Fehlschläge)."""
+        url = absolute_image_url(url)
+        variant = self.variant(remove_watermark)
+        with self.lock:
+            name = self.urls.get(url, {}).get(variant)
+            data = self._read(name) if name else None
+            self.counters["hits" if data is not None else "misses"] += 1
+        return data
+
+    def put_raw(self, url, raw, remove_watermark=True, validators=None):
+        """Rohdaten bearbeiten (oder vorhandenen Blob gleichen Inhalts nutzen) und der URL zuordnen.
+        validators (ETag / Last-Modified) merken wir uns für revalidate()."""
+        url = absolute_image_url(url)
+        variant = self.variant(remove_watermark)
+        name = f"{hashlib.sha256(raw).hexdigest()}-{variant}.jpg"
+        with self.lock:
+            data = self._read(name)
+            if data is not None: self.counters["content_hits"] += 1
+        if data is None:
+            data = process_image(raw, remove_watermark=remove_watermark)
+        with self.lock:
+            pruned = self._write(name, data) if name not in self.blobs else False
+            if url:
+                self.urls.setdefault(url, {})[variant] = name
+                if validators: self.urls[url]["_validators"] = validators
+            if url or pruned: self._save_index()
+        return data
+
+    def fetch(self, get, url, remove_watermark=True):
+        """Cache zuerst, sonst herunterladen, bearbeiten und ablegen. Liefert bytes oder None."""
+        data = self.get(url, remove_watermark)
+        if data is not None: return data
+        raw, validators = fetch_image(get, url)
+        if not raw: return None
+        with self.lock: self.counters["downloads"] += 1
+        return self.put_raw(url, raw, remove_watermark, validators)
+
+    def revalidate(self, get, url, remove_watermark=True):
+        """Bedingter Request mit gespeichertem ETag / Last-Modified. False = unverändert (304),
+        True = neues Bild (Cache aktualisiert), None = keine Aussage möglich."""
+        url = absolute_image_url(url)
+        with self.lock: validators = self.urls.get(url, {}).get("_validators")
+        if not validators: return None
+        r = get(url, headers=conditional_headers(validators), timeout=DOWNLOAD_TIMEOUT)
+        if r.status_code == 304:
+            with self.lock: self.counters["not_modified"] += 1
+            return False
+        if r.status_code != 200 or not r.content: return None
+        with self.lock:
+            self.counters["downloads"] += 1
+            old = self.urls.get(url, {}).get(self.variant(remove_watermark))
+        self.put_raw(url, r.content, remove_watermark, http_validators(r))
+        with self.lock: return self.urls[url].get(self.variant(remove_watermark)) != old
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, blobs=len(self.blobs), bytes=self.total, urls=len(self.urls))
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_image_cache():
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None: _CACHE = ImageCache()
+        return _CACHE
+
+def load_and_process(get=None, url=None, file_path=None, remove_watermark=True):
+    """Bild aus lokaler Datei (falls vorhanden), dem Bild-Cache oder per Download holen. Liefert bytes oder None.
+    Lokale Dateien aus Produkt_Bilder sind bereits bereinigt, dort wird nur noch verkleinert."""
+    if file_path and os.path.exists(file_path):
+        with open(file_path, "rb") as f: raw = f.read()
+        return process_image(raw, remove_watermark=False)
+    if not url: return None
+    cache = get_image_cache()
+    if not get: return cache.get(url, remove_watermark)
+    return cache.fetch(get, url, remove_watermark)
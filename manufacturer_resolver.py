@@ -0,0 +1,69 @@
+from collections import deque
+
+# ==========================================
+# HERSTELLER -> BC HERSTELLERCODE
+# ==========================================
+# Wird einmal beim Import gebaut: casefold-Dict für exakte Treffer und ein
+# Aho-Corasick-Automat über alle Schlüssel für Teilstring-Treffer in einem Durchlauf.
+
+class ManufacturerResolver:
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        self.exact = {}
+        for key in self.mapping:
+            self.exact.setdefault(key.casefold(), key)
+
+        # Trie: goto[state] = {zeichen: state}, out[state] = Schlüssel, die hier enden
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for order, key in enumerate(self.mapping):
+            folded = key.casefold()
+            if not folded: continue
+            state = 0
+            for ch in folded:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][ch] = nxt
+                state = nxt
+            self.out[state].append((len(folded), order, key))
+
+        # Fail-Links per Breitensuche
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]: f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find_all(self, text):
+        """Alle Schlüssel, die in text vorkommen: Liste von (start, länge, reihenfolge, schlüssel)."""
+        hits = []
+        state = 0
+        for pos, ch in enumerate(text.casefold()):
+            while state and ch not in self.goto[state]: state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, order, key in self.out[state]:
+                hits.append((pos - length + 1, length, order, key))
+        return hits
+
+    def resolve_key(self, name):
+        """Passender Mapping-Schlüssel: exakt (casefold), sonst längster Teilstring-Treffer.
+        Bei gleicher Länge gewinnt der frühere Treffer im Text, dann die Mapping-Reihenfolge."""
+        if not name: return None
+        folded = str(name).strip().casefold()
+        if folded in self.exact: return self.exact[folded]
+        hits = self.find_all(folded)
+        if not hits: return None
+        return min(hits, key=lambda h: (-h[1], h[0], h[2]))[3]
+
+    def resolve(self, name):
+        key = self.resolve_key(name)
+        return self.mapping[key] if key else None
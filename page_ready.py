@@ -0,0 +1,93 @@
+import time
+import threading
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# ==========================================
+# SEITEN-BEREITSCHAFT (EXPLIZITE WAITS)
+# ==========================================
+# Statt fester Sleeps wird auf konkrete Elemente gewartet: so kurz wie nötig, so lange
+# wie erlaubt. Jeder Schritt hat ein eigenes Timeout und wird in TIMINGS gemessen.
+
+POLL_INTERVAL      = 0.1
+DETAIL_TIMEOUTS    = {"h1": 15, "breadcrumb": 5, "specs": 5}
+OVERVIEW_TIMEOUT   = 20
+SCROLL_GROW_TIMEOUT = 3     # so lange nach jedem Scrollen auf neue Karten warten
+SCROLL_MAX_ROUNDS  = 30
+
+OVERVIEW_CARD_CSS  = "div.MuiGrid2-grid-xs-6 div.MuiCard-root a"
+DETAIL_STEPS = {
+    "h1":         [(By.TAG_NAME, "h1")],
+    "breadcrumb": [(By.XPATH, "//li[contains(@class, 'MuiBreadcrumbs-li')]//p")],
+    # Spezifikationen: THC-Label und Hersteller-Block
+    "specs":      [(By.XPATH, "//p[text()='THC']"), (By.XPATH, "//*[contains(text(), 'Im Sortiment von')]")],
+}
+
+class StepTimings:
+    """Dauer pro Warteschritt (thread-sicher, für den Worker-Pool)."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+
+    def record(self, step, seconds, ok):
+        with self.lock:
+            d = self.data[step]
+            d["count"] += 1
+            d["total"] += seconds
+            d["max"] = max(d["max"], seconds)
+            if not ok: d["timeouts"] += 1
+
+    def summary(self):
+        with self.lock:
+            return {step: {"count": d["count"], "avg": round(d["total"] / d["count"], 3),
+                           "max": round(d["max"], 3), "timeouts": d["timeouts"]}
+                    for step, d in self.data.items() if d["count"]}
+
+TIMINGS = StepTimings()
+
+def wait_step(driver, step, condition, timeout):
+    """Wartet bis condition(driver) wahr ist. Liefert True/False (Timeout) und misst die Dauer."""
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+        ok = True
+    except TimeoutException:
+        ok = False
+    TIMINGS.record(step, time.monotonic() - start, ok)
+    return ok
+
+def all_present(locators):
+    return lambda d: all(d.find_elements(by, sel) for by, sel in locators)
+
+def wait_for_detail_page(driver, timeouts=None):
+    """Wartet auf h1, Breadcrumb und Spezifikationen. Liefert die Schritte, die ins Timeout liefen."""
+    timeouts = {**DETAIL_TIMEOUTS, **(timeouts or {})}
+    missing = []
+    for step, locators in DETAIL_STEPS.items():
+        if not wait_step(driver, f"detail.{step}", all_present(locators), timeouts[step]):
+            missing.append(step)
+            # Ohne h1 ist die Seite nicht da, die restlichen Schritte würden nur Zeit kosten
+            if step == "h1": break
+    return missing
+
+def count_cards(driver, css=OVERVIEW_CARD_CSS):
+    return len(driver.find_elements(By.CSS_SELECTOR, css))
+
+def scroll_until_stable(driver, css=OVERVIEW_CARD_CSS, grow_timeout=SCROLL_GROW_TIMEOUT, max_rounds=SCROLL_MAX_ROUNDS):
+    """Scrollt ans Seitenende, bis nach einem Scroll keine neuen Karten mehr nachladen. Liefert die Kartenanzahl."""
+    if not wait_step(driver, "overview.cards", lambda d: count_cards(d, css) > 0, OVERVIEW_TIMEOUT):
+        return 0
+    start = time.monotonic()
+    count = count_cards(driver, css)
+    for _ in range(max_rounds):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        before = count
+        # Der letzte Durchlauf endet immer im Timeout (= nichts mehr nachgeladen)
+        if not wait_step(driver, "overview.grow", lambda d: count_cards(d, css) > before, grow_timeout):
+            break
+        count = count_cards(driver, css)
+    TIMINGS.record("overview.scroll", time.monotonic() - start, True)
+    return count
@@ -1,16 +1,25 @@
-import time
 import os
+import sys
+import time
+import threading
 import requests
 import re
 import hashlib
 import json
+from collections import Counter
 from datetime import datetime
-from PIL import Image, ImageDraw
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib3.util.retry import Retry
 
+try:
+    from lxml import html as lxml_html
+except ImportError:  # Ohne lxml gibt es keinen HTTP-Schnellweg, alles läuft über den Browser
+    lxml_html = None
+
 # Selenium
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -19,7 +28,11 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
 # Lokale Logik & BC Connector
-from connector import BusinessCentralConnector, VALUE_MAPPINGS, clean_string_global
+from image_pipeline import get_image_cache, http_validators, conditional_headers
+from driver_pool import DriverPool
+from crawl_checkpoint import CrawlCheckpoint
+from page_ready import wait_for_detail_page, scroll_until_stable, TIMINGS
+from connector import BusinessCentralConnector, VALUE_MAPPINGS, clean_string_global, classify_match_score, MATCH_REVIEW_THRESHOLD, resolve_manufacturer_code
 
 # --- CONFIG & INITIALISIERUNG ---
 load_dotenv()
@@ -28,10 +41,32 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-START_URL = "https://flowzz.com/product?pagination%5Bpage%5D=124"
+OVERVIEW_URL = "https://flowzz.com/product?pagination%5Bpage%5D={page}"
+CRAWL_START_PAGE = int(os.getenv("CRAWL_START_PAGE", "1"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500"))     # Sicherheitsgrenze, Ende = erste leere Seite
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))   # Übersichtsseiten pro Runde
 ANZAHL_CHECK = 2000
 BILDER_ORDNER = "Produkt_Bilder"
 MAX_ITEMS_PRO_SPALTE = 3
+MATCH_BATCH_SIZE = 25  # Neuheiten pro paralleler Match-Runde (get_match_info_batch)
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "3"))               # parallele Chrome-Instanzen für Detailseiten
+DRIVER_RECYCLE_AFTER = int(os.getenv("DRIVER_RECYCLE_AFTER", "50"))  # Seiten pro Chrome bis zum Neustart
+QUEUE_CHUNK_SIZE = 50        # Einträge pro Bulk-Upsert
+QUEUE_FLUSH_SECONDS = 30     # spätestens so lange bleibt ein Eintrag im Puffer
+QUEUE_UPSERT_RPC = "upsert_import_queue"   # siehe sql/upsert_import_queue.sql
+QUEUE_RPC_ATTEMPTS = 3       # vorübergehende Fehler (Timeout, 5xx) werden wiederholt
+FINAL_STATUSES = ['PROCESSED', 'IGNORED']
+CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "1") == "1"
+CHANGE_CHECK_STATUSES = ['READY', 'REVIEW', 'DUPLICATE']   # fertige Produkte bleiben unangetastet
+CHECK_IMAGES = True         # bei geänderter/ungecachter Seite auch das Bild per ETag prüfen
+CONTENT_HASH_SKIP = ['Bild Datei', 'Hersteller Code']   # lokaler Pfad bzw. aus 'Hersteller' abgeleitet, kein Seiteninhalt
+CHANGE_NONE, CHANGE_FOUND, CHANGE_UNKNOWN = "unverändert", "geändert", "unklar"
+CHANGE_BASELINE = "referenz"   # noch ohne Fingerprint gespeichert: aktueller Stand wird Vergleichsbasis
+KNOWN_URL_CHUNK = 100   # URLs pro in_()-Abfrage (bleibt unter der URL-Längengrenze von PostgREST)
+KNOWN_URL_PAGE = 1000   # Zeilen pro range()-Seite beim Laden der ganzen Queue
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "16"))                  # parallele Detailseiten ohne Browser
+HTTP_TIMEOUT = (10, 30)
+HTTP_REQUIRED_FIELDS = ['Produktname', 'Hersteller', 'THC']  # fehlt eins, übernimmt Selenium
 
 # --- HELPER FUNKTIONEN (ORIGINAL GITHUB LOGIK) ---
 def make_session():
@@ -86,33 +121,20 @@ def clean_number_int(text):
         return str(int(round(val)))
     except: return ""
 
-def remove_watermark_rectangle(file_path):
-    try:
-        with Image.open(file_path) as img:
-            img = img.convert("RGB")
-            width, height = img.size
-            draw = ImageDraw.Draw(img)
-            coords = [width - 380, height - 160, width, height]
-            draw.rectangle(coords, fill=(255, 255, 255), outline=None)
-            img.save(file_path, quality=95)
-    except: pass
-
 def sanitize_filename(name):
     return re.sub(r'[\\/*?:"<>|]', "", name).strip()
 
-def download_image(url, product_name):
+def download_image(url, product_name, refresh=False):
     if not url: return None
     if not os.path.exists(BILDER_ORDNER): os.makedirs(BILDER_ORDNER, exist_ok=True)
     filename = f"{sanitize_filename(product_name)}.jpg"
     file_path = os.path.join(BILDER_ORDNER, filename)
-    if os.path.exists(file_path): return file_path
+    if os.path.exists(file_path) and not refresh: return file_path
     try:
-        if url.startswith("/"): url = f"https://flowzz.com{url}"
-        response = SESSION.get(url, timeout=(10, 45), stream=True)
-        if response.status_code == 200:
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(1024): f.write(chunk)
-            remove_watermark_rectangle(file_path) 
+        # Bild-Cache (URL/Inhalt) zuerst, sonst Download + Bearbeitung im Speicher, dann ein Schreibvorgang
+        data = get_image_cache().fetch(SESSION.get, url)
+        if data:
+            with open(file_path, 'wb') as f: f.write(data)
             return file_path
     except: pass
     return None
@@ -198,48 +220,320 @@ def hole_bild_url(driver):
         return ""
     except: return ""
 
-def scrape_full_details(driver, url):
-    driver.get(url)
-    time.sleep(3)
-    daten = {'URL': url}
-    try: daten['Produktname'] = driver.find_element(By.TAG_NAME, "h1").text.strip()
-    except: daten['Produktname'] = "Unbekannt"
-    
+LIST_GROUPS = [("Kategorie Effekt", ["Effekte", "Wirkung"]), 
+               ("Aroma", ["Aroma", "Geschmack"]), 
+               ("Terpen", "Terpene"), 
+               ("Med. Wirkung", ["Medizinische Wirkung", "Medizinische Wirkung bei"])]
+USE_JS_EXTRACTION = True  # False = nur die hole_* Helfer (viele WebDriver-Roundtrips)
+
+# Ein execute_script statt ~50 WebDriver-Roundtrips. Gleiche XPaths wie die hole_* Helfer,
+# Bereinigung (clean_text, clean_number_int) passiert danach in Python.
+EXTRACT_SCRIPT = """
+const groups = arguments[0];
+const one = (path, ctx) => document.evaluate(path, ctx || document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const all = (path, ctx) => {
+    const r = document.evaluate(path, ctx || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const out = [];
+    for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+    return out;
+};
+const txt = el => el ? (el.innerText || el.textContent || '').trim() : '';
+const after = (labelPath) => { const l = one(labelPath); return l ? txt(one('following::p[1]', l)) : ''; };
+
+const breads = all("//li[contains(@class, 'MuiBreadcrumbs-li')]//p");
+const flag = one("//img[contains(@src, 'flagcdn')]");
+let bestrahlung = '';
+if (all("//*[contains(@data-testid, 'NotIrradiated')]").length) bestrahlung = 'Unbestrahlt';
+else if (all("//*[contains(@data-testid, 'Irradiated')]").length) bestrahlung = 'Bestrahlt';
+const strain = one("//h3[contains(text(), 'Über diesen Strain')]");
+let bild = '';
+for (const img of all("//div[contains(@class, 'MuiGrid-item')]//img")) {
+    const src = img.src;
+    if (src && (src.includes('next/image') || src.includes('assets.flowzz'))) { bild = src; break; }
+}
+const lists = {};
+for (const [key, keywords] of groups) {
+    lists[key] = keywords.map(kw => all(`//*[self::h2 or self::h3 or self::h4 or self::h5 or self::p or self::div][contains(text(), '${kw}')]`).map(h => {
+        const c = one('following-sibling::div[1]', h);
+        return c ? all(".//*[contains(@class, 'MuiTypography-body1') or contains(@class, 'MuiChip-label')]", c).map(txt) : null;
+    }));
+}
+const h1 = one('//h1');
+return JSON.stringify({
+    name: h1 ? txt(h1) : null,
+    breadcrumb: breads.length ? txt(breads[breads.length - 1]) : null,
+    hersteller: after("//*[contains(text(), 'Im Sortiment von')]"),
+    herkunft: flag && flag.parentElement ? txt(flag.parentElement) : '',
+    bestrahlung: bestrahlung,
+    thc: after("//p[text()='THC']"),
+    cbd: after("//p[text()='CBD']"),
+    chips: Array.from(document.querySelectorAll('.MuiChip-label')).map(txt),
+    kultivar: strain ? txt(one("following::a[contains(@href, '/strain/')][1]", strain)) : '',
+    bild_url: bild,
+    lists: lists
+});
+"""
+
+def liste_aus_rohdaten(raw_groups, keywords):
+    """Gleiche Logik wie hole_listen_safe, aber auf den Texten aus EXTRACT_SCRIPT."""
+    ergebnis_liste = []
+    if isinstance(keywords, str): keywords = [keywords]
+    for headers in raw_groups:
+        for items in headers:
+            if items is None: continue
+            for item in items:
+                t = clean_text(item)
+                if t and t not in ergebnis_liste and t not in keywords and len(t) < 40:
+                    ergebnis_liste.append(t)
+            if ergebnis_liste: break
+    return list(dict.fromkeys(ergebnis_liste))
+
+def felder_aus_rohdaten(raw):
+    """Rohtexte (EXTRACT_SCRIPT bzw. rohdaten_aus_html) -> bereinigte Felder für baue_daten."""
+    sorte = next((c for c in raw['chips'] if any(x in c for x in ["Hybrid", "Indica", "Sativa"])), "")
+    return {
+        'Produktname': raw['name'] if raw['name'] is not None else "Unbekannt",
+        'BC_DisplayName': raw['breadcrumb'],
+        'Hersteller': raw['hersteller'],
+        'Herkunft': raw['herkunft'],
+        'Bestrahlung': raw['bestrahlung'],
+        'THC': clean_number_int(raw['thc']),
+        'CBD': clean_number_int(raw['cbd']),
+        'Sorte': sorte,
+        'Kultivar': raw['kultivar'],
+        'Bild URL': raw['bild_url'],
+        'Listen': {key: liste_aus_rohdaten(raw['lists'].get(key, []), keywords) for key, keywords in LIST_GROUPS},
+    }
+
+def felder_per_script(driver):
+    """Alle Felder mit einem execute_script. Liefert None, wenn das Script scheitert."""
+    try:
+        groups = [(key, [keywords] if isinstance(keywords, str) else keywords) for key, keywords in LIST_GROUPS]
+        raw = json.loads(driver.execute_script(EXTRACT_SCRIPT, groups))
+    except Exception as e:
+        print(f"   ⚠️ JS-Extraktion fehlgeschlagen, nutze Einzel-Helfer: {e}")
+        return None
+    return felder_aus_rohdaten(raw)
+
+def felder_per_helfer(driver):
+    """Fallback: die einzelnen hole_* Helfer."""
+    try: name = driver.find_element(By.TAG_NAME, "h1").text.strip()
+    except: name = "Unbekannt"
     try:
         breads = driver.find_elements(By.XPATH, "//li[contains(@class, 'MuiBreadcrumbs-li')]//p")
-        daten['BC_DisplayName'] = breads[-1].text.strip() if breads else daten['Produktname']
-    except: daten['BC_DisplayName'] = daten['Produktname']
-
-    daten['Hersteller']  = hole_hersteller(driver)
-    daten['Herkunft']    = hole_herkunftsland(driver)
-    daten['Bestrahlung'] = hole_bestrahlung(driver)
-    daten['THC']         = hole_thc_cbd(driver, "THC") 
-    daten['CBD']         = hole_thc_cbd(driver, "CBD") 
-    daten['Sorte']       = hole_sorte_genetik(driver)
-    daten['Kultivar']    = hole_kultivar(driver)
+        bread = breads[-1].text.strip() if breads else None
+    except: bread = None
+    return {
+        'Produktname': name,
+        'BC_DisplayName': bread,
+        'Hersteller': hole_hersteller(driver),
+        'Herkunft': hole_herkunftsland(driver),
+        'Bestrahlung': hole_bestrahlung(driver),
+        'THC': hole_thc_cbd(driver, "THC"),
+        'CBD': hole_thc_cbd(driver, "CBD"),
+        'Sorte': hole_sorte_genetik(driver),
+        'Kultivar': hole_kultivar(driver),
+        'Bild URL': hole_bild_url(driver),
+        'Listen': {key: hole_listen_safe(driver, keywords) for key, keywords in LIST_GROUPS},
+    }
+
+def baue_daten(url, felder, bild=True):
+    """Setzt das daten-Dict (Schlüssel & Reihenfolge wie bisher) aus den extrahierten Feldern zusammen.
+    bild=False spart den Bild-Download (Änderungsprüfung), '_fingerprint' kommt als letzter Schlüssel dazu."""
+    daten = {'URL': url}
+    daten['Produktname'] = felder['Produktname']
+    daten['BC_DisplayName'] = felder['BC_DisplayName'] if felder['BC_DisplayName'] is not None else daten['Produktname']
+
+    daten['Hersteller']  = felder['Hersteller']
+    daten['Hersteller Code'] = resolve_manufacturer_code(daten['Hersteller']) or ""
+    daten['Herkunft']    = felder['Herkunft']
+    daten['Bestrahlung'] = felder['Bestrahlung']
+    daten['THC']         = felder['THC']
+    daten['CBD']         = felder['CBD']
+    daten['Sorte']       = felder['Sorte']
+    daten['Kultivar']    = felder['Kultivar']
     daten['Produktgruppe'] = "Blüten"
     
-    img_url = hole_bild_url(driver)
-    daten['Bild Datei'] = download_image(img_url, daten['Produktname'])
+    img_url = felder['Bild URL']
+    daten['Bild Datei'] = download_image(img_url, daten['Produktname']) if bild else None
     daten['Bild Datei URL'] = img_url 
     
-    # Listen Scrapen
-    for key, keywords in [("Kategorie Effekt", ["Effekte", "Wirkung"]), 
-                         ("Aroma", ["Aroma", "Geschmack"]), 
-                         ("Terpen", "Terpene"), 
-                         ("Med. Wirkung", ["Medizinische Wirkung", "Medizinische Wirkung bei"])]:
-        items = hole_listen_safe(driver, keywords)
+    # Listen
+    for key, _ in LIST_GROUPS:
+        items = felder['Listen'][key]
         for i in range(MAX_ITEMS_PRO_SPALTE):
             daten[f'{key} {i+1}'] = items[i] if i < len(items) else ""
 
+    daten['_fingerprint'] = {'content_hash': create_content_hash(daten)}
     return daten
 
+def scrape_full_details(driver, url):
+    driver.get(url)
+    missing = wait_for_detail_page(driver)
+    if missing: print(f"   ⏱️ Timeout beim Warten auf {', '.join(missing)}: {url}")
+    felder = felder_per_script(driver) if USE_JS_EXTRACTION else None
+    return baue_daten(url, felder or felder_per_helfer(driver))
+
+# --- HTTP-SCHNELLWEG (OHNE BROWSER) ---
+# Die Detailseiten werden serverseitig gerendert: dieselben XPaths wie EXTRACT_SCRIPT,
+# nur per lxml auf dem HTML aus SESSION. Ergebnis im selben Rohformat wie das Script.
+
+def rohdaten_aus_html(page_html, url):
+    doc = lxml_html.fromstring(page_html)
+    def alle(path, ctx=None): return (doc if ctx is None else ctx).xpath(path)
+    def eins(path, ctx=None):
+        found = alle(path, ctx)
+        return found[0] if found else None
+    def txt(el): return " ".join(el.text_content().split()) if el is not None else ""
+    def nach(label_path):
+        label = eins(label_path)
+        return txt(eins("following::p[1]", label)) if label is not None else ""
+
+    breads = alle("//li[contains(@class, 'MuiBreadcrumbs-li')]//p")
+    flag = eins("//img[contains(@src, 'flagcdn')]")
+    bestrahlung = ""
+    if alle("//*[contains(@data-testid, 'NotIrradiated')]"): bestrahlung = "Unbestrahlt"
+    elif alle("//*[contains(@data-testid, 'Irradiated')]"): bestrahlung = "Bestrahlt"
+    strain = eins("//h3[contains(text(), 'Über diesen Strain')]")
+    bild = ""
+    for img in alle("//div[contains(@class, 'MuiGrid-item')]//img"):
+        src = urljoin(url, img.get("src") or "")
+        if img.get("src") and ("next/image" in src or "assets.flowzz" in src):
+            bild = src
+            break
+    lists = {}
+    for key, keywords in LIST_GROUPS:
+        if isinstance(keywords, str): keywords = [keywords]
+        lists[key] = []
+        for kw in keywords:
+            headers = []
+            for h in alle(f"//*[self::h2 or self::h3 or self::h4 or self::h5 or self::p or self::div][contains(text(), '{kw}')]"):
+                c = eins("following-sibling::div[1]", h)
+                headers.append([txt(i) for i in alle(".//*[contains(@class, 'MuiTypography-body1') or contains(@class, 'MuiChip-label')]", c)] if c is not None else None)
+            lists[key].append(headers)
+    h1 = eins("//h1")
+    return {
+        'name': txt(h1) if h1 is not None else None,
+        'breadcrumb': txt(breads[-1]) if breads else None,
+        'hersteller': nach("//*[contains(text(), 'Im Sortiment von')]"),
+        'herkunft': txt(flag.getparent()) if flag is not None and flag.getparent() is not None else "",
+        'bestrahlung': bestrahlung,
+        'thc': nach("//p[text()='THC']"),
+        'cbd': nach("//p[text()='CBD']"),
+        'chips': [txt(c) for c in alle("//*[contains(concat(' ', normalize-space(@class), ' '), ' MuiChip-label ')]")],
+        'kultivar': txt(eins("following::a[contains(@href, '/strain/')][1]", strain)) if strain is not None else "",
+        'bild_url': bild,
+        'lists': lists,
+    }
+
+def scrape_per_http(url):
+    """Detailseite ohne Browser. Liefert das daten-Dict oder None (dann muss Selenium ran)."""
+    if lxml_html is None: return None
+    try:
+        r = SESSION.get(url, timeout=HTTP_TIMEOUT)
+        if r.status_code != 200: return None
+        felder = felder_aus_rohdaten(rohdaten_aus_html(r.text, url))
+    except Exception as e:
+        print(f"   ⚠️ HTTP-Scrape fehlgeschlagen ({url}): {e}")
+        return None
+    if any(not felder[k] or felder[k] == "Unbekannt" for k in HTTP_REQUIRED_FIELDS): return None
+    daten = baue_daten(url, felder)
+    daten['_fingerprint'].update(http_validators(r))   # ETag / Last-Modified für die nächste Prüfung
+    return daten
+
+# --- ÄNDERUNGSERKENNUNG ---
+# Bekannte, noch offene Produkte werden mit einem bedingten GET geprüft (ETag / Last-Modified).
+# 304 = fertig nach einem Request. Sonst wird das HTML direkt geparst und per Fingerprint bzw.
+# Feld-Diff verglichen; nur echte Änderungen laden Bilder und landen mit Diff erneut in der Queue.
+
+def content_fields(daten):
+    return {k: v for k, v in (daten or {}).items() if k not in CONTENT_HASH_SKIP and not k.startswith('_')}
+
+def diff_scraped(old, new):
+    """Geänderte Felder: {feld: [alt, neu]}. Nur Felder, die in den gespeicherten Daten vorkommen
+    (später hinzugekommene Felder sind keine Änderung der Seite)."""
+    old_f, new_f = content_fields(old), content_fields(new)
+    return {k: [old_f[k], new_f.get(k)] for k in old_f if old_f[k] != new_f.get(k)}
+
+def check_for_changes(url, old_sd):
+    """Liefert (zustand, daten, diff). daten bei CHANGE_FOUND (inkl. '_changes'), bei CHANGE_BASELINE
+    der neue Fingerprint für Einträge, die noch keinen haben."""
+    old_sd = old_sd or {}
+    fp = old_sd.get('_fingerprint') or {}
+    if lxml_html is None: return CHANGE_UNKNOWN, None, {}
+    try:
+        r = SESSION.get(url, headers=conditional_headers(fp), timeout=HTTP_TIMEOUT)
+        if r.status_code == 304: return CHANGE_NONE, None, {}
+        if r.status_code != 200: return CHANGE_UNKNOWN, None, {}
+        felder = felder_aus_rohdaten(rohdaten_aus_html(r.text, url))
+    except Exception as e:
+        print(f"   ⚠️ Änderungsprüfung fehlgeschlagen ({url}): {e}")
+        return CHANGE_UNKNOWN, None, {}
+    if any(not felder[k] or felder[k] == "Unbekannt" for k in HTTP_REQUIRED_FIELDS): return CHANGE_UNKNOWN, None, {}
+
+    daten = baue_daten(url, felder, bild=False)
+    daten['_fingerprint'].update(http_validators(r))
+    # Vor der Änderungserkennung gescrapt: nichts zum Vergleichen, heutiger Stand wird die Referenz
+    if not fp.get('content_hash'): return CHANGE_BASELINE, daten['_fingerprint'], {}
+    img_url = daten['Bild Datei URL']
+    image_changed = bool(CHECK_IMAGES and img_url and img_url == old_sd.get('Bild Datei URL')
+                         and get_image_cache().revalidate(SESSION.get, img_url))
+    if fp.get('content_hash') == daten['_fingerprint']['content_hash'] and not image_changed:
+        return CHANGE_NONE, None, {}
+
+    # Gespeicherte Daten sind vorgereinigt, also auf gleicher Basis vergleichen
+    diff = diff_scraped(old_sd, apply_pre_cleaning(dict(daten)))
+    if image_changed: diff['Bild'] = [img_url, img_url]
+    if not diff: return CHANGE_NONE, None, {}
+    daten['Bild Datei'] = download_image(img_url, daten['Produktname'], refresh=image_changed or 'Bild Datei URL' in diff)
+    daten['_changes'] = {'at': datetime.now().isoformat(timespec='seconds'), 'fields': diff}
+    return CHANGE_FOUND, daten, diff
+
+def fetch_queue_rows(urls):
+    """URL -> gespeicherte Queue-Zeile (gechunkte in_()-Abfragen)."""
+    rows = {}
+    urls = list(dict.fromkeys(urls))
+    for start in range(0, len(urls), KNOWN_URL_CHUNK):
+        res = (supabase.table("import_queue_duplicate").select("url, product_hash, produktname, status, match_info, scraped_data")
+               .in_("url", urls[start:start + KNOWN_URL_CHUNK]).execute())
+        rows.update((r['url'], r) for r in res.data)
+    return rows
+
+def store_fingerprints(rows):
+    """Schreibt Referenz-Fingerprints in bestehende Einträge (Status und Inhalt bleiben). rows: [(zeile, fingerprint)]."""
+    updates = [{"product_hash": row['product_hash'], "produktname": row['produktname'], "status": row['status'],
+                "match_info": row['match_info'], "scraped_data": {**(row['scraped_data'] or {}), '_fingerprint': fp}, "url": row['url']}
+               for row, fp in rows]
+    for start in range(0, len(updates), QUEUE_CHUNK_SIZE):
+        write_queue_rows(updates[start:start + QUEUE_CHUNK_SIZE])
+
+def detect_changes(urls):
+    """Prüft bekannte URLs parallel auf Änderungen. Liefert [(url, daten)] der geänderten Produkte."""
+    if not urls: return []
+    old = fetch_queue_rows(urls)
+    stats = Counter()
+    changed, baselines = [], []
+    with ThreadPoolExecutor(max_workers=HTTP_WORKERS) as executor:
+        results = executor.map(lambda u: check_for_changes(u, (old.get(u) or {}).get('scraped_data')), urls)
+        for url, (state, daten, diff) in zip(urls, results):
+            stats[state] += 1
+            if state == CHANGE_FOUND:
+                print(f"   🔁 Geändert: {url} -> {', '.join(diff)}")
+                changed.append((url, daten))
+            elif state == CHANGE_BASELINE and old.get(url):
+                baselines.append((old[url], daten))
+    print(f"🔎 Änderungsprüfung: {dict(stats)}")
+    if baselines:
+        try: store_fingerprints(baselines)
+        except Exception as e: print(f"   ⚠️ Referenz-Fingerprints nicht gespeichert: {e}")
+    return changed
+
 def hole_links_von_uebersicht(driver):
     print(f"🔎 JavaScript-Turbo-Scan wird gestartet...")
     
-    # Kurz nach unten scrollen, um Lazy-Loading zu triggern
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(10) 
+    # Scrollen, bis das Lazy-Loading keine neuen Karten mehr nachlädt
+    cards = scroll_until_stable(driver)
+    print(f"   📜 {cards} Karten geladen.")
     
     script = """
     return Array.from(
@@ -256,6 +550,70 @@ def hole_links_von_uebersicht(driver):
     print(f"✅ {len(found)} Links in Millisekunden extrahiert.")
     return found
 
+# --- KATALOG-CRAWL (ALLE ÜBERSICHTSSEITEN) ---
+OVERVIEW_LINK_XPATH = "//div[contains(@class, 'MuiGrid2-grid-xs-6')]//div[contains(@class, 'MuiCard-root')]//a/@href"
+
+def overview_url(page):
+    return OVERVIEW_URL.format(page=page)
+
+def links_per_http(page_url):
+    """Produkt-Links einer Übersichtsseite aus dem Server-HTML. None = Browser muss ran."""
+    if lxml_html is None: return None
+    try:
+        r = SESSION.get(page_url, timeout=HTTP_TIMEOUT)
+        if r.status_code != 200: return None
+        hrefs = lxml_html.fromstring(r.text).xpath(OVERVIEW_LINK_XPATH)
+    except Exception:
+        return None
+    # Leere Seite per HTTP kann auch "nur clientseitig gerendert" heißen, das klärt der Browser
+    return list(dict.fromkeys(urljoin(page_url, h) for h in hrefs if h)) or None
+
+def links_von_seite(driver, page_url):
+    driver.get(page_url)
+    return hole_links_von_uebersicht(driver)
+
+def crawl_catalog(checkpoint, start_page=CRAWL_START_PAGE, max_pages=CRAWL_MAX_PAGES):
+    """Liest alle Übersichtsseiten (rundenweise parallel) bis zur ersten leeren Seite.
+    Fertige Seiten landen im Checkpoint und werden beim Neustart übersprungen. Liefert alle Links."""
+    if checkpoint.crawl_finished:
+        print(f"♻️ Crawl aus Checkpoint: {len(checkpoint.links)} Links, {len(checkpoint.pages_done)} Seiten.")
+        return list(checkpoint.links)
+    started = time.monotonic()
+    fetched, links_before = 0, len(checkpoint.links)
+    page, last_page = start_page, start_page + max_pages - 1
+    end_page, failed = None, []
+    with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as executor, \
+         DriverPool(get_driver, links_von_seite, workers=SCRAPE_WORKERS, recycle_after=DRIVER_RECYCLE_AFTER) as pool:
+        while end_page is None and page <= last_page:
+            window = [p for p in range(page, min(page + CRAWL_CONCURRENCY, last_page + 1)) if p not in checkpoint.pages_done]
+            page += CRAWL_CONCURRENCY
+            if not window: continue
+            results = dict(zip(window, executor.map(lambda p: links_per_http(overview_url(p)), window)))
+            fallback = {overview_url(p): p for p, links in results.items() if links is None}
+            for page_url, links, err in pool.imap_unordered(list(fallback)):
+                if err is not None: print(f"   ❌ Übersicht {page_url} fehlgeschlagen: {err}")
+                results[fallback[page_url]] = links if err is None else None
+            for p in sorted(results):
+                links = results[p]
+                if links is None:
+                    failed.append(p)         # bleibt offen für den nächsten Lauf
+                    continue
+                fetched += 1
+                if not links:
+                    end_page = p if end_page is None else min(end_page, p)   # erste leere Seite = Ende des Katalogs
+                    continue
+                checkpoint.add_page(p, links)
+            print(f"   📄 Seiten bis {max(window)}: {len(checkpoint.links)} Links gesamt.")
+    # Nur komplett, wenn keine Seite davor fehlgeschlagen ist (sonst holt der Neustart sie nach)
+    failed = [p for p in failed if end_page is None or p < end_page]
+    if end_page is not None and not failed: checkpoint.mark_crawl_finished()
+    elif failed: print(f"   ⚠️ Übersichtsseiten fehlgeschlagen: {sorted(failed)}")
+    elapsed = max(time.monotonic() - started, 1e-9)
+    new_links = len(checkpoint.links) - links_before
+    print(f"📈 Crawl: {fetched} Seiten in {elapsed:.1f}s ({fetched / elapsed:.2f} Seiten/s), "
+          f"{new_links} Links ({new_links / elapsed:.1f} Links/s).")
+    return list(checkpoint.links)
+
 def apply_pre_cleaning(details):
     def normalize_for_match(s): return re.sub(r'[\W_]+', '', s.lower())
     for key, mappings in VALUE_MAPPINGS.items():
@@ -274,34 +632,222 @@ def create_product_hash(hersteller, produktname, thc):
     clean_identity = re.sub(r'[\W_]+', '', identity)
     return hashlib.md5(clean_identity.encode()).hexdigest()
 
+def create_content_hash(daten):
+    """Fingerprint über alle Inhaltsfelder (nicht nur die Identität wie create_product_hash)."""
+    content = json.dumps(content_fields(daten), sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(content.encode()).hexdigest()
+
+def fetch_known_urls(urls=None):
+    """URL -> Status aller bekannten Queue-Einträge in wenigen Abfragen statt einer pro Link.
+    Mit urls: gechunkte in_()-Filter nur für diese Links, sonst die ganze Queue seitenweise per range()."""
+    known = {}
+    table = supabase.table("import_queue_duplicate")
+    if urls is not None:
+        urls = list(dict.fromkeys(urls))
+        for start in range(0, len(urls), KNOWN_URL_CHUNK):
+            res = table.select("url, status").in_("url", urls[start:start + KNOWN_URL_CHUNK]).execute()
+            known.update((r['url'], r['status']) for r in res.data)
+        return known
+    start = 0
+    while True:
+        res = table.select("url, status").order("id").range(start, start + KNOWN_URL_PAGE - 1).execute()
+        known.update((r['url'], r['status']) for r in res.data if r.get('url'))
+        if len(res.data) < KNOWN_URL_PAGE: return known
+        start += KNOWN_URL_PAGE
+
+def build_queue_payload(entry):
+    sd = entry['ScrapedData']
+    return {
+        "product_hash": create_product_hash(sd.get('Hersteller'), entry['Produktname'], sd.get('THC')),
+        "produktname": entry['Produktname'],
+        "status": entry['Status'],
+        "match_info": entry['MatchInfo'],
+        "scraped_data": sd,
+        # 1. Priorität auf die übergebene URL aus dem Loop
+        "url": entry.get("url") or sd.get('URL')
+    }
+
+_RPC_AVAILABLE = True
+
+def is_missing_rpc(error):
+    """PostgREST kennt die Funktion nicht (SQL noch nicht eingespielt)."""
+    return getattr(error, 'code', None) == "PGRST202" or "could not find the function" in str(error).lower()
+
+def write_queue_rows(rows):
+    """Schreibt Queue-Zeilen als ein Statement pro Chunk. Fertige Produkte (PROCESSED / IGNORED)
+    schützt die RPC-Funktion selbst; ohne sie gibt es eine Abfrage pro Chunk statt pro Produkt."""
+    global _RPC_AVAILABLE
+    # Pro URL nur die letzte Version (ON CONFLICT darf eine Zeile nur einmal treffen)
+    rows = list({r['url']: r for r in rows}.values())
+    if not rows: return 0
+    for attempt in range(QUEUE_RPC_ATTEMPTS):
+        if not _RPC_AVAILABLE: break
+        try:
+            res = supabase.rpc(QUEUE_UPSERT_RPC, {"rows": rows}).execute()
+            return res.data if isinstance(res.data, int) else len(rows)
+        except Exception as e:
+            # Nur eine fehlende Funktion schaltet dauerhaft auf den Fallback, alles andere wird wiederholt
+            if is_missing_rpc(e):
+                print(f"   ⚠️ RPC {QUEUE_UPSERT_RPC} nicht vorhanden, nutze Upsert mit Vorab-Check.")
+                _RPC_AVAILABLE = False
+            elif attempt == QUEUE_RPC_ATTEMPTS - 1:
+                raise
+            else:
+                print(f"   ⚠️ RPC {QUEUE_UPSERT_RPC} fehlgeschlagen ({e}), neuer Versuch...")
+                time.sleep(2 ** attempt)
+    table = supabase.table("import_queue_duplicate")
+    hashes = list({r['product_hash'] for r in rows})
+    urls = [r['url'] for r in rows]
+    done_hashes = {r['product_hash'] for r in table.select("product_hash").in_("product_hash", hashes).in_("status", FINAL_STATUSES).execute().data}
+    done_urls = {r['url'] for r in table.select("url").in_("url", urls).in_("status", FINAL_STATUSES).execute().data}
+    rows = [r for r in rows if r['product_hash'] not in done_hashes and r['url'] not in done_urls]
+    # 2. Entscheidend: on_conflict="url" statt "product_hash"
+    if rows: table.upsert(rows, on_conflict="url").execute()
+    return len(rows)
+
 def sync_to_supabase(entry):
+    """Einzelner Eintrag, ohne Puffer (Keine Änderung bei fertigen Produkten)."""
     try:
-        sd = entry['ScrapedData']
-        fingerprint = create_product_hash(sd.get('Hersteller'), entry['Produktname'], sd.get('THC'))
-        
-        # 1. Priorität auf die übergebene URL aus dem Loop
-        target_url = entry.get("url") or sd.get('URL')
-
-        # Check ob bereits verarbeitet (PROCESSED / IGNORED)
-        existing = supabase.table("import_queue_duplicate").select("status").eq("product_hash", fingerprint).execute()
-        if existing.data:
-            if existing.data[0]['status'] in ['PROCESSED', 'IGNORED']:
-                return # Keine Änderung bei fertigen Produkten
-
-        payload = {
-            "product_hash": fingerprint,
-            "produktname": entry['Produktname'],
-            "status": entry['Status'],
-            "match_info": entry['MatchInfo'],
-            "scraped_data": sd,
-            "url": target_url
-        }
-        # 2. Entscheidend: on_conflict="url" statt "product_hash"
-        supabase.table("import_queue_duplicate").upsert(payload, on_conflict="url").execute()
+        write_queue_rows([build_queue_payload(entry)])
         print(f"✅ Synchronisiert: {entry['Produktname']}")
     except Exception as e:
         print(f"❌ Supabase Sync Fehler: {e}")
 
+class QueueWriter:
+    """Puffert Queue-Einträge und schreibt sie gechunkt: bei QUEUE_CHUNK_SIZE Einträgen, spätestens
+    nach QUEUE_FLUSH_SECONDS (Hintergrund-Thread) und bei close(). Ein Absturz kostet höchstens einen Chunk."""
+    def __init__(self, chunk_size=QUEUE_CHUNK_SIZE, flush_seconds=QUEUE_FLUSH_SECONDS, on_flush=None):
+        """on_flush(rows) wird nach jedem erfolgreich geschriebenen Chunk aufgerufen."""
+        self.chunk_size = chunk_size
+        self.on_flush = on_flush
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.written = 0
+        self.timer = threading.Thread(target=self._timer_loop, name="queue-writer", daemon=True)
+        self.timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, entry):
+        with self.lock:
+            self.buffer.append(build_queue_payload(entry))
+            if self.oldest is None: self.oldest = time.monotonic()
+            full = len(self.buffer) >= self.chunk_size
+        if full: self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.buffer, self.oldest = self.buffer, [], None
+        if not rows: return
+        try:
+            self.written += write_queue_rows(rows)
+            print(f"✅ Synchronisiert: {len(rows)} Einträge")
+            if self.on_flush: self.on_flush(rows)
+        except Exception as e:
+            print(f"❌ Supabase Sync Fehler ({len(rows)} Einträge): {e}")
+
+    def _timer_loop(self):
+        while not self.stop.wait(1):
+            with self.lock:
+                due = self.oldest is not None and time.monotonic() - self.oldest >= self.flush_seconds
+            if due: self.flush()
+
+    def close(self):
+        self.stop.set()
+        self.timer.join()
+        self.flush()
+
+# --- MATCHING (BATCH) ---
+
+def build_bc_check_name(details):
+    # --- DEIN GENIALER NAMENS-CHECK ---
+    p_name = details.get('Produktname', '').strip()
+    p_kultivar = details.get('Kultivar', '').strip()
+    bc_name_check = details.get('BC_DisplayName', p_name)
+    
+    if p_name and p_kultivar:
+        clean_p_name = p_name
+        if p_name.endswith(p_kultivar):
+             if not p_name.endswith(f"- {p_kultivar}") and not p_name.endswith(f"-{p_kultivar}"):
+                 clean_p_name = p_name[:-len(p_kultivar)].strip()
+        bc_name_check = f"{clean_p_name} - {p_kultivar}"
+    return bc_name_check
+
+def build_match_status(match_name, score, match_no):
+    status = classify_match_score(score)
+    info_text = "Neu"
+    if status == "DUPLICATE":
+        info_text = f"Gefunden: {match_name} ({match_no})"
+    elif status == "REVIEW":
+        info_text = f"Ähnlich: {match_name} ({match_no}) | {int(score*100)}%"
+    return status, info_text
+
+def match_and_sync(bc, pending, known=None, writer=None):
+    """Prüft gesammelte Neuheiten parallel gegen BC und synchronisiert sie nach Supabase
+    (gepuffert über writer, sonst einzeln). known (URL -> Status) wird um die Links ergänzt."""
+    if not pending: return
+    print(f"   🔍 Prüfe {len(pending)} Neuheiten gegen BC...")
+    # Unterhalb der REVIEW-Schwelle zählt nur "Neu", dort darf der Scorer früh abbrechen
+    results = bc.get_match_info_batch([name for _, _, name in pending], score_cutoff=MATCH_REVIEW_THRESHOLD)
+    for (link, details, bc_name_check), (match_name, score, match_no) in zip(pending, results):
+        print(f"   🔍 Prüfung für: '{bc_name_check}'")
+        status, info_text = build_match_status(match_name, score, match_no)
+        if details.get('_changes'):
+            info_text = f"Geändert ({', '.join(details['_changes']['fields'])}) | {info_text}"
+
+        # Sync des neuen Artikels
+        (writer.add if writer else sync_to_supabase)({
+            "url": link,
+            "Produktname": details['Produktname'],
+            "Status": status,
+            "MatchInfo": info_text,
+            "ScrapedData": details
+        })
+        if known is not None: known[link] = status
+
+def run_rescore():
+    """Einstieg für 'python scraper.py --rescore': offene Queue gegen den aktuellen BC-Stand neu bewerten."""
+    print("🚀 START: Neubewertung der Queue")
+    try:
+        bc = BusinessCentralConnector()
+        bc.authenticate()
+    except Exception as e:
+        print(f"❌ ABBRUCH: BC nicht erreichbar: {e}"); return
+    try:
+        rescore_queue(bc)
+    finally:
+        bc.close_match_pool()
+
+def rescore_queue(bc, statuses=("READY", "REVIEW", "DUPLICATE")):
+    """Bewertet alle offenen Queue-Einträge neu (z.B. nachdem in BC Artikel angelegt wurden).
+    Liest seitenweise per range() und schreibt nur geänderte Zeilen, gechunkt über write_queue_rows."""
+    table = supabase.table("import_queue_duplicate")
+    rows, start = [], 0
+    while True:
+        res = (table.select("id, url, product_hash, produktname, status, match_info, scraped_data")
+               .in_("status", list(statuses)).order("id").range(start, start + KNOWN_URL_PAGE - 1).execute())
+        rows.extend(r for r in res.data if r.get('scraped_data') and r.get('url'))
+        if len(res.data) < KNOWN_URL_PAGE: break
+        start += KNOWN_URL_PAGE
+    results = bc.get_match_info_batch([build_bc_check_name(r['scraped_data']) for r in rows], score_cutoff=MATCH_REVIEW_THRESHOLD)
+    updates, changed = [], 0
+    for row, (match_name, score, match_no) in zip(rows, results):
+        status, info_text = build_match_status(match_name, score, match_no)
+        if status != row['status']: changed += 1
+        if status == row['status'] and info_text == row['match_info']: continue
+        updates.append({"product_hash": row['product_hash'], "produktname": row['produktname'], "status": status,
+                        "match_info": info_text, "scraped_data": row['scraped_data'], "url": row['url']})
+    for start in range(0, len(updates), QUEUE_CHUNK_SIZE):
+        write_queue_rows(updates[start:start + QUEUE_CHUNK_SIZE])
+    print(f"✅ {len(rows)} Einträge neu bewertet, {changed} mit neuem Status, {len(updates)} geschrieben.")
+
 # --- MAIN RUNNER ---
 
 def run_nightly_scraper():
@@ -312,70 +858,89 @@ def run_nightly_scraper():
     except Exception as e:
         print(f"❌ ABBRUCH: BC nicht erreichbar: {e}"); return
 
-    driver = get_driver()
+    checkpoint = CrawlCheckpoint()
+    if checkpoint.resumed:
+        print(f"♻️ Setze abgebrochenen Lauf fort ({len(checkpoint.pages_done)} Seiten, {len(checkpoint.links_done)} Links erledigt).")
+    pending = []  # Gescrapte Neuheiten, die gesammelt per Batch gegen BC geprüft werden
+    writer = QueueWriter(on_flush=lambda rows: checkpoint.mark_links_done(r['url'] for r in rows))
+    started = time.monotonic()
+    scraped = 0
+    completed = False
     try:
-        print(f"🌍 Öffne URL: {START_URL}")
-        driver.get(START_URL)
-        time.sleep(5)
-        links = hole_links_von_uebersicht(driver)
-
-        for link in links:
-            # --- DER ENTSCHEIDENDE PERFORMANCE-CHECK ---
-            # Wir prüfen anhand der URL, ob der Artikel schon in Supabase ist
-            check = supabase.table("import_queue_duplicate").select("status").eq("url", link).execute()
-            
-            if check.data:
-                # Artikel ist bekannt (haben wir gerade im Quick-Import erledigt)
-                # Wir überspringen ihn sofort, um Zeit zu sparen.
-                continue 
-
-            # Ab hier landen nur noch ECHTE NEUHEITEN
-            print(f"\n✨ NEUHEIT ENTDECKT: {link}")
-            details = scrape_full_details(driver, link)
-            
+        links = crawl_catalog(checkpoint)
+
+        # --- DER ENTSCHEIDENDE PERFORMANCE-CHECK ---
+        # Bekannte URLs einmal vorab laden statt einer Supabase-Abfrage pro Link
+        known = fetch_known_urls(links)
+        new_links = [link for link in links if link not in known and link not in checkpoint.links_done]
+        print(f"   📋 {len(links) - len(new_links)} von {len(links)} Links bereits in der Queue.")
+        # Vor dem Sync festhalten, sonst würden die Neuheiten dieses Laufs gleich mitgeprüft
+        recheck = [link for link in links if known.get(link) in CHANGE_CHECK_STATUSES and link not in checkpoint.links_done]
+
+        def neuheit(link, details, label="✨ NEUHEIT ENTDECKT"):
+            nonlocal scraped
+            scraped += 1
+            print(f"\n{label}: {link}")
             if not details.get('Produktname') or details['Produktname'] == "Unbekannt": 
-                continue
+                return
 
             details = apply_pre_cleaning(details)
 
-            # --- DEIN GENIALER NAMENS-CHECK ---
-            p_name = details.get('Produktname', '').strip()
-            p_kultivar = details.get('Kultivar', '').strip()
-            bc_name_check = details.get('BC_DisplayName', p_name)
-            
-            if p_name and p_kultivar:
-                clean_p_name = p_name
-                if p_name.endswith(p_kultivar):
-                     if not p_name.endswith(f"- {p_kultivar}") and not p_name.endswith(f"-{p_kultivar}"):
-                         clean_p_name = p_name[:-len(p_kultivar)].strip()
-                bc_name_check = f"{clean_p_name} - {p_kultivar}"
-
-            print(f"   🔍 Prüfung für: '{bc_name_check}'")
-            match_name, score, match_no = bc.get_match_info(bc_name_check)
-            
-            status = "READY"
-            info_text = "Neu"
-            if score > 0.98:
-                status = "DUPLICATE"
-                info_text = f"Gefunden: {match_name} ({match_no})"
-            elif score > 0.85:
-                status = "REVIEW"
-                info_text = f"Ähnlich: {match_name} ({match_no}) | {int(score*100)}%"
-
-            # Sync des neuen Artikels
-            sync_to_supabase({
-                "url": link,
-                "Produktname": details['Produktname'],
-                "Status": status,
-                "MatchInfo": info_text,
-                "ScrapedData": details
-            })
+            pending.append((link, details, build_bc_check_name(details)))
+            if len(pending) >= MATCH_BATCH_SIZE:
+                match_and_sync(bc, pending, known, writer)
+                pending.clear()
+
+        # Ab hier landen nur noch ECHTE NEUHEITEN: erst parallel per HTTP, Rest im Browser
+        browser_links = []
+        if lxml_html is not None and new_links:
+            with ThreadPoolExecutor(max_workers=HTTP_WORKERS) as executor:
+                futures = {executor.submit(scrape_per_http, link): link for link in new_links}
+                for future in as_completed(futures):
+                    details = future.result()
+                    if details is None: browser_links.append(futures[future])
+                    else: neuheit(futures[future], details)
+            print(f"   ⚡ HTTP: {len(new_links) - len(browser_links)} von {len(new_links)} Neuheiten ohne Browser.")
+        else:
+            browser_links = new_links
+
+        if browser_links:
+            print(f"✨ {len(browser_links)} Neuheiten, scrape mit {SCRAPE_WORKERS} Browsern...")
+            with DriverPool(get_driver, scrape_full_details, workers=SCRAPE_WORKERS, recycle_after=DRIVER_RECYCLE_AFTER) as pool:
+                for link, details, err in pool.imap_unordered(browser_links):
+                    if err is not None:
+                        print(f"   ❌ Scrape-Fehler bei {link}: {err}")
+                        continue
+                    neuheit(link, details)
+                print(f"   🧭 Browser-Pool: {pool.stats}")
+
+        # Bekannte, offene Produkte: nur bei Änderungen erneut in die Queue (mit Diff)
+        if CHANGE_DETECTION:
+            for link, details in detect_changes(recheck):
+                neuheit(link, details, label="🔁 ÄNDERUNG ENTDECKT")
+
+        # Rest-Batch abarbeiten
+        match_and_sync(bc, pending, known, writer)
+        pending.clear()
+        writer.flush()
+        completed = True
 
     except Exception as e:
         print(f"❌ Fehler im Haupt-Loop: {e}")
+        # Bereits gescrapte Neuheiten nicht verlieren
+        try: match_and_sync(bc, pending, writer=writer)
+        except Exception as sync_err: print(f"❌ Rest-Sync fehlgeschlagen: {sync_err}")
     finally:
-        driver.quit()
+        writer.close()  # Rest-Puffer schreiben
+        # Erst nach close(): ein laufender Timer-Flush würde den Checkpoint sonst neu anlegen
+        if completed and checkpoint.crawl_finished: checkpoint.clear()
+        bc.close_match_pool()
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"📈 Gesamt: {scraped} Detailseiten in {elapsed:.1f}s ({scraped / elapsed:.2f} Links/s).")
+        print(f"🖼️ Bild-Cache: {get_image_cache().stats()}")
+        print(f"⏱️ Wartezeiten: {TIMINGS.summary()}")
         print("😴 Scraper beendet.")
 
 if __name__ == "__main__":
-    run_nightly_scraper()
\ No newline at end of file
+    if "--rescore" in sys.argv[1:]: run_rescore()
+    else: run_nightly_scraper()
\ No newline at end of file
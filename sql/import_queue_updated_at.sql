@@ -0,0 +1,23 @@
+-- Änderungszeitpunkt für das inkrementelle Nachladen im Dashboard (dashboard.sync_queue).
+-- Einmalig im Supabase SQL-Editor ausführen. Ohne die Spalte lädt das Dashboard nur neue ids nach.
+
+alter table import_queue_duplicate
+  add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists import_queue_duplicate_updated_at_idx
+  on import_queue_duplicate (updated_at);
+
+create or replace function set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at = clock_timestamp();
+  return new;
+end;
+$$;
+
+drop trigger if exists import_queue_duplicate_set_updated_at on import_queue_duplicate;
+create trigger import_queue_duplicate_set_updated_at
+  before update on import_queue_duplicate
+  for each row execute function set_updated_at();
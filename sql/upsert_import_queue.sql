@@ -0,0 +1,32 @@
+-- Bulk-Upsert für den Scraper (scraper.QueueWriter).
+-- Ein Statement pro Chunk: neue URLs einfügen, bestehende aktualisieren, aber nie Zeilen
+-- anfassen, deren Produkt (product_hash) oder URL bereits PROCESSED/IGNORED ist.
+-- Einmalig im Supabase SQL-Editor ausführen.
+
+create or replace function upsert_import_queue(rows jsonb)
+returns integer
+language sql
+as $$
+  with incoming as (
+    select product_hash, produktname, status, match_info, scraped_data, url
+    from jsonb_populate_recordset(null::import_queue_duplicate, rows)
+  ),
+  written as (
+    insert into import_queue_duplicate (product_hash, produktname, status, match_info, scraped_data, url)
+    select i.product_hash, i.produktname, i.status, i.match_info, i.scraped_data, i.url
+    from incoming i
+    where not exists (
+      select 1 from import_queue_duplicate q
+      where q.product_hash = i.product_hash and q.status in ('PROCESSED', 'IGNORED')
+    )
+    on conflict (url) do update set
+      product_hash = excluded.product_hash,
+      produktname  = excluded.produktname,
+      status       = excluded.status,
+      match_info   = excluded.match_info,
+      scraped_data = excluded.scraped_data
+    where import_queue_duplicate.status not in ('PROCESSED', 'IGNORED')
+    returning 1
+  )
+  select count(*)::integer from written;
+$$;
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import bc_transport
+from bc_transport import BCTransport, retry_after_seconds
+
+class Response:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.text = str(body)
+    def json(self):
+        return self.body
+
+class FakeSession:
+    """Antwortet nacheinander mit den übergebenen Responses bzw. wirft die übergebenen Exceptions."""
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls.append({"method": method, "url": url, "headers": dict(headers or {}), **kwargs})
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception): raise answer
+        return answer
+
+class Tokens:
+    def __init__(self):
+        self.refreshes = 0
+    def __call__(self, force_refresh=False):
+        if force_refresh: self.refreshes += 1
+        return f"token-{self.refreshes}"
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(bc_transport.time, "sleep", waits.append)
+    return waits
+
+def transport(*answers):
+    tokens = Tokens()
+    t = BCTransport(tokens)
+    t.session = FakeSession(*answers)
+    return t, tokens
+
+URL = "https://api.businesscentral.dynamics.com/v2.0/t/env/api/v2.0/companies(1)/items"
+
+# --- 401 ---
+
+def test_401_refreshes_token_once_and_retries(sleeps):
+    t, tokens = transport(Response(401), Response(200))
+    assert t.get(URL).status_code == 200
+    assert tokens.refreshes == 1
+    assert [c["headers"]["Authorization"] for c in t.session.calls] == ["Bearer token-0", "Bearer token-1"]
+    assert sleeps == []
+
+def test_second_401_is_returned(sleeps):
+    t, tokens = transport(Response(401), Response(401))
+    assert t.get(URL).status_code == 401
+    assert tokens.refreshes == 1 and len(t.session.calls) == 2
+
+def test_no_auth_header_without_auth(sleeps):
+    t, _ = transport(Response(200))
+    t.post("https://login.microsoftonline.com/x/oauth2/v2.0/token", auth=False)
+    assert "Authorization" not in t.session.calls[0]["headers"]
+
+# --- Retry-After & Backoff ---
+
+def test_retry_after_seconds(sleeps):
+    t, _ = transport(Response(429, headers={"Retry-After": "7"}), Response(200))
+    assert t.get(URL).status_code == 200
+    assert sleeps == [7.0]
+
+def test_retry_after_http_date():
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert retry_after_seconds(Response(503, headers={"Retry-After": future})) == pytest.approx(30, abs=2)
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert retry_after_seconds(Response(503, headers={"Retry-After": past})) == 0.0
+    assert retry_after_seconds(Response(503, headers={"Retry-After": "bald"})) is None
+    assert retry_after_seconds(Response(503)) is None
+
+def test_backoff_without_retry_after_is_capped(sleeps):
+    t, _ = transport(*[Response(503)] * (bc_transport.MAX_RETRIES + 1))
+    assert t.get(URL).status_code == 503
+    assert len(t.session.calls) == bc_transport.MAX_RETRIES + 1
+    assert sleeps == [min(bc_transport.BACKOFF_FACTOR * 2 ** i, bc_transport.MAX_BACKOFF) for i in range(bc_transport.MAX_RETRIES)]
+
+# --- POST nicht doppelt verarbeiten ---
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_post_is_not_retried_on_gateway_errors(sleeps, status):
+    t, _ = transport(Response(status))
+    assert t.post(URL, json={}).status_code == status
+    assert len(t.session.calls) == 1
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_get_is_retried_on_gateway_errors(sleeps, status):
+    t, _ = transport(Response(status), Response(200))
+    assert t.get(URL).status_code == 200
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_post_is_retried_when_nothing_was_processed(sleeps, status):
+    t, _ = transport(Response(status), Response(201))
+    assert t.post(URL, json={}).status_code == 201
+
+def test_post_is_not_retried_after_read_timeout(sleeps):
+    t, _ = transport(requests.ReadTimeout("read"), Response(201))
+    with pytest.raises(requests.ReadTimeout):
+        t.post(URL, json={})
+    assert len(t.session.calls) == 1
+
+def test_post_is_retried_after_connect_timeout(sleeps):
+    t, _ = transport(requests.ConnectTimeout("connect"), Response(201))
+    assert t.post(URL, json={}).status_code == 201
+
+def test_get_is_retried_after_read_timeout(sleeps):
+    t, _ = transport(requests.ReadTimeout("read"), Response(200))
+    assert t.get(URL).status_code == 200
+
+# --- $batch ---
+
+def ops(n):
+    return [{"method": "POST", "url": f"items({i})", "body": {"n": i}} for i in range(n)]
+
+def test_batch_maps_out_of_order_responses_by_id(sleeps):
+    body = {"responses": [{"id": "2", "status": 201, "body": "c"}, {"id": "0", "status": 201, "body": "a"},
+                          {"id": "1", "status": 400, "body": "already exists"}]}
+    t, _ = transport(Response(200, body))
+    results = t.batch("https://bc/api", ops(3))
+    assert results == [{"status": 201, "body": "a"}, {"status": 400, "body": "already exists"}, {"status": 201, "body": "c"}]
+    sent = t.session.calls[0]
+    assert sent["url"] == "https://bc/api/$batch"
+    assert [r["id"] for r in sent["json"]["requests"]] == ["0", "1", "2"]
+
+def test_batch_chunks_and_fills_missing_responses(sleeps):
+    first = Response(200, {"responses": [{"id": "1", "status": 201, "body": None}]})
+    second = Response(500, "kaputt")
+    t, _ = transport(first, second)
+    results = t.batch("https://bc/api", ops(3), chunk_size=2)
+    assert len(t.session.calls) == 2
+    assert [r["status"] for r in results] == [200, 201, 500]
+    assert [r["id"] for r in t.session.calls[1]["json"]["requests"]] == ["0"]
+
+def test_stats_count_retries_per_endpoint(sleeps):
+    t, _ = transport(Response(401), Response(503), Response(200))
+    t.get(URL)
+    assert t.stats() == {"GET items": 3, "GET items !401": 1, "GET items !503": 1}
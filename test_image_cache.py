@@ -0,0 +1,91 @@
+import json
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from image_pipeline import ImageCache
+
+def jpeg(color, size=(64, 64)):
+    out = BytesIO()
+    Image.new("RGB", size, color).save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+# Upload-fertige JPEGs ohne Wasserzeichen werden unverändert abgelegt: Blob-Größe = len(raw)
+RED, GREEN, BLUE = jpeg((255, 0, 0)), jpeg((0, 255, 0)), jpeg((0, 0, 255))
+
+def url(n): return f"https://flowzz.com/bild/{n}.jpg"
+
+def put(cache, n, raw, validators=None):
+    return cache.put_raw(url(n), raw, remove_watermark=False, validators=validators)
+
+def get(cache, n):
+    return cache.get(url(n), remove_watermark=False)
+
+def index_on_disk(cache):
+    with open(cache.index_path, encoding="utf-8") as f: return json.load(f)
+
+def test_hit_miss_counters(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    assert get(cache, 1) is None
+    put(cache, 1, RED)
+    assert get(cache, 1) == RED
+    assert get(cache, 1) == RED
+    assert cache.get(url(1), remove_watermark=True) is None   # andere Variante
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["blobs"], stats["urls"]) == (2, 2, 1, 1)
+
+def test_same_content_shares_one_blob(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    put(cache, 1, RED)
+    put(cache, 2, RED)
+    stats = cache.stats()
+    assert (stats["content_hits"], stats["blobs"], stats["urls"]) == (1, 1, 2)
+    assert stats["bytes"] == len(RED)
+    assert get(cache, 1) == get(cache, 2) == RED
+    assert len(os.listdir(cache.blob_dir)) == 1
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=len(RED) + len(GREEN) + len(BLUE) - 1)
+    put(cache, 1, RED, {"etag": '"r"'})
+    put(cache, 2, GREEN)
+    assert get(cache, 1) == RED          # 1 zuletzt benutzt, 2 ist jetzt der älteste
+    put(cache, 3, BLUE)
+    assert cache.stats()["evictions"] == 1
+    assert get(cache, 2) is None
+    assert get(cache, 1) == RED and get(cache, 3) == BLUE
+    assert cache.stats()["bytes"] == len(RED) + len(BLUE)
+
+def test_eviction_prunes_url_index(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=len(RED) + len(GREEN))
+    put(cache, 1, RED, {"etag": '"r"'})
+    put(cache, 2, RED)                   # zweite URL auf denselben Blob
+    put(cache, 3, GREEN)
+    put(cache, 4, BLUE)                  # verdrängt den RED-Blob
+    assert set(cache.urls) == {url(3), url(4)}
+    assert set(index_on_disk(cache)) == {url(3), url(4)}
+    assert cache.revalidate(lambda *a, **kw: None, url(1)) is None   # Validatoren mit verworfen
+
+    # Neu geladen: Index und Blobs passen zusammen
+    reloaded = ImageCache(str(tmp_path), max_bytes=cache.max_bytes)
+    assert set(reloaded.urls) == {url(3), url(4)}
+    assert get(reloaded, 3) == GREEN and get(reloaded, 4) == BLUE
+
+def test_eviction_keeps_other_variants(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    put(cache, 1, RED, {"etag": '"r"'})
+    cache.put_raw(url(1), RED, remove_watermark=True)
+    put(cache, 2, GREEN)
+    cache.max_bytes = cache.total - len(RED) + len(BLUE)
+    put(cache, 3, BLUE)                  # verdrängt nur die Variante ohne Wasserzeichen-Bearbeitung
+    assert get(cache, 1) is None
+    assert cache.get(url(1), remove_watermark=True) is not None
+    assert cache.urls[url(1)]["_validators"] == {"etag": '"r"'}
+
+def test_missing_blob_is_dropped_from_index(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    put(cache, 1, RED)
+    put(cache, 2, GREEN)
+    os.remove(os.path.join(cache.blob_dir, cache.urls[url(1)][cache.variant(False)]))
+    reloaded = ImageCache(str(tmp_path))
+    assert set(reloaded.urls) == {url(2)}
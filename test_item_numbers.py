@@ -0,0 +1,74 @@
+import pytest
+
+from bc_mirror import CatalogMirror
+from connector import BusinessCentralConnector, START_NUMMER
+
+def items(numbers):
+    return [{'id': f"id-{n}", 'number': n, 'displayName': f"Artikel {n}"} for n in numbers]
+
+# BC sortiert Nummern als Text: bei diesen Beständen liefert "number desc" nicht die höchste Nummer
+@pytest.mark.parametrize("numbers, expected", [
+    ([f"100.{n}" for n in range(1, 3600)], 3599),
+    ([f"100.{n}" for n in range(3001, 10005)], 10004),
+    (["100.12", "100.3002", "100.999", "200.9999", "100.ABC", "100.12x"], 3002),
+    (["100.5", "100.999"], START_NUMMER),
+    ([], START_NUMMER),
+])
+def test_max_item_number_is_numeric(monkeypatch, numbers, expected):
+    # Aus dem Spiegel (Artikelstamm nicht geladen) ...
+    bc = BusinessCentralConnector()
+    bc.mirror = CatalogMirror(":memory:")
+    bc.mirror.upsert_items(items(numbers))
+    monkeypatch.setattr(bc, "_sync_items_mirror", lambda force_full=False: (None, False))
+    assert bc._fetch_max_item_number() == expected
+    assert bc._items_cache is None
+
+    # ... und aus dem geladenen Artikelstamm
+    bc.existing_items_cache = items(numbers)
+    assert bc._fetch_max_item_number() == expected
+
+class Response:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code, self.body, self.text = status_code, body, text
+    def json(self): return self.body
+
+class FakeHttp:
+    """BC-Artikelanlage: lehnt Nummern ab, die es schon gibt."""
+    def __init__(self, taken):
+        self.taken, self.posted = set(taken), []
+    def post(self, url, json=None, **kwargs):
+        self.posted.append(json["number"])
+        if json["number"] in self.taken:
+            return Response(400, text=f"The record in table Item already exists. Nr.={json['number']}")
+        self.taken.add(json["number"])
+        return Response(201, {'id': f"id-{json['number']}", **json})
+
+def test_collision_reseeds_from_server(monkeypatch):
+    bc = BusinessCentralConnector()
+    bc.company_id = "test-collision"
+    bc.mirror = CatalogMirror(":memory:")
+    bc.mirror.upsert_items(items(["100.3100"]))
+    monkeypatch.setattr(bc, "_sync_items_mirror", lambda force_full=False: (None, False))
+    assert bc.find_next_number() == "100.3101"
+
+    # Ein anderer Prozess legt inzwischen 100.3101 bis 100.3110 an; der nächste Delta-Sync bringt sie mit
+    others = [f"100.{n}" for n in range(3101, 3111)]
+    syncs = []
+    monkeypatch.setattr(bc, "_sync_items_mirror",
+                        lambda force_full=False: syncs.append(1) or (bc.mirror.upsert_items(items(others)), False))
+    bc.http = FakeHttp(others)
+    r = bc._post_item("items", {'number': bc.find_next_number(), 'displayName': "Neu"})
+    assert r.status_code == 201
+    assert bc.http.posted == ["100.3102", "100.3111"]
+    assert len(syncs) == 1
+    assert bc.find_next_number() == "100.3112"
+
+def test_reseed_never_goes_below_reserved_block(monkeypatch):
+    bc = BusinessCentralConnector()
+    bc.company_id = "test-reserve"
+    bc.mirror = CatalogMirror(":memory:")
+    monkeypatch.setattr(bc, "_sync_items_mirror", lambda force_full=False: (None, False))
+    block = bc.reserve_numbers(5)
+    assert block == [f"100.{START_NUMMER + n}" for n in range(1, 6)]
+    # Kollision auf der ersten Blocknummer: die übrigen Blocknummern bleiben reserviert
+    assert bc._allocator().reseed(lambda: START_NUMMER, block[0]) == f"100.{START_NUMMER + 6}"
@@ -0,0 +1,41 @@
+import pytest
+
+from connector import MANUFACTURER_CODE_MAPPING, resolve_manufacturer_code
+from manufacturer_resolver import ManufacturerResolver
+
+# Jeder Mapping-Eintrag: exakt, andere Schreibweise, mit Leerraum und eingebettet in längeren Text
+VARIANTS = [lambda k: k, str.upper, str.lower, lambda k: f"  {k} ", lambda k: f"{k} GmbH", lambda k: f"Vertrieb: {k}"]
+
+@pytest.mark.parametrize("key, code", MANUFACTURER_CODE_MAPPING.items())
+def test_every_mapping_entry_resolves(key, code):
+    for variant in VARIANTS:
+        assert resolve_manufacturer_code(variant(key)) == code
+
+@pytest.mark.parametrize("name", [None, "", "   ", "Unbekannter Hersteller XY"])
+def test_unknown_names_resolve_to_none(name):
+    assert resolve_manufacturer_code(name) is None
+
+# --- Überlappende Schlüssel ---
+
+def test_longest_match_wins():
+    resolver = ManufacturerResolver({"Can": "CAN", "Canopy": "CANOPY"})
+    assert resolver.resolve("Best Canopy Ltd") == "CANOPY"
+
+def test_longest_match_wins_over_leftmost():
+    resolver = ManufacturerResolver({"Ab": "AB", "Bcdef": "BCDEF"})
+    assert resolver.resolve("xAbcdef") == "BCDEF"
+
+def test_leftmost_wins_at_equal_length():
+    resolver = ManufacturerResolver({"Abcd": "ABCD", "Wxyz": "WXYZ"})
+    assert resolver.resolve("Wxyz und Abcd") == "WXYZ"
+    assert resolver.resolve("Abcd und Wxyz") == "ABCD"
+
+def test_mapping_order_breaks_remaining_ties():
+    resolver = ManufacturerResolver({"ENUA": "FIRST", "Enua": "SECOND"})
+    assert resolver.resolve("enua") == "FIRST"
+    assert resolver.resolve("Vertrieb: Enua") == "FIRST"
+
+def test_overlapping_real_keys():
+    assert resolve_manufacturer_code("Remexian Pharma GmbH") == "REMEXIAN"
+    assert resolve_manufacturer_code("Cannabistada") == "CA-STADA"
+    assert resolve_manufacturer_code("Beacon Medical Germany") == "BEACON"
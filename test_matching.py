@@ -0,0 +1,131 @@
+import re
+from difflib import SequenceMatcher
+
+import pytest
+
+from connector import BusinessCentralConnector, MatchIndex, MATCH_TOP_K, classify_match_score
+
+# ==========================================
+# FIXTURE-KATALOG
+# ==========================================
+# Deterministischer Artikelstamm, groß genug, dass die Trigramm-Vorauswahl greift (> MATCH_TOP_K).
+
+HERSTELLER = ["Aurora", "Bedrocan", "Cantourage", "Demecan", "Tilray", "Remexian", "Enua", "Four 20 Pharma"]
+SORTEN     = ["Pink Kush", "Ghost Train Haze", "Casper's Dream", "Wedding Cake", "Gelato 41",
+              "Lemon Skunk", "Master Kush", "Amnesia Haze", "Blue Dream", "Sour Diesel"]
+RATIOS     = ["22/1", "18/1", "25/1", "27/1"]
+
+CATALOG = [{'number': f"100.{3001 + i}", 'displayName': f"{h} {s} {r} Cannabis Blüten"}
+           for i, (h, s, r) in enumerate((h, s, r) for h in HERSTELLER for s in SORTEN for r in RATIOS)]
+
+QUERIES = (
+    # Exakt, Präfix, andere Schreibweise, andere Ratio, Tippfehler, unbekannt
+    [item['displayName'] for item in CATALOG[::7]]
+    + [f"{h} {s}" for h in HERSTELLER for s in SORTEN[::3]]
+    + [f"{h} {s.replace(chr(39), '’')} 22/1 Flos" for h in HERSTELLER[:3] for s in SORTEN]
+    + [f"{h} {s} 20/1 Cannabis Blüten" for h in HERSTELLER[::2] for s in SORTEN]
+    + [f"{h} {s[:-1]}x {r}" for h in HERSTELLER[1::3] for s in SORTEN for r in RATIOS[:2]]
+    + ["Peace Naturals Northern Lights 20/1", "Khiron Critical Mass", "Ganz neuer Artikel", ""]
+)
+
+# ==========================================
+# REFERENZ: BISHERIGER VOLLVERGLEICH
+# ==========================================
+# Unveränderte Logik des alten get_match_info (vor Index und Vorauswahl).
+
+def baseline_match(items, new_name):
+    best_score, best_name, best_no = 0.0, "Kein Vergleichswert", None
+    if not items: return best_name, 0.0, None
+    ignore_words = ["cannabis", "flos", "blüten", "extract", "gmbh", "kultivar", "strain"]
+
+    def remove_fillers(text):
+        t = text.lower()
+        for w in ignore_words: t = t.replace(w, "")
+        return re.sub(r'[^\w\s]', '', t).strip()
+
+    def token_sort_ratio(str1, str2):
+        if not str1 or not str2: return 0.0
+        clean = lambda s: " ".join(sorted(re.sub(r'[^\w\s/]', '', str(s).lower()).split()))
+        return SequenceMatcher(None, clean(str1), clean(str2)).ratio()
+
+    clean_new_name = remove_fillers(new_name)
+    for item in items:
+        existing_name = item['displayName']
+        clean_existing_name = remove_fillers(existing_name)
+        current_score = max(SequenceMatcher(None, clean_new_name, clean_existing_name).ratio(),
+                            token_sort_ratio(new_name, existing_name))
+        if existing_name.lower().startswith(new_name.lower()) or new_name.lower().startswith(existing_name.lower()):
+            if current_score < 0.95: current_score = 0.95
+        if clean_new_name == clean_existing_name:
+            if current_score < 0.98: current_score = 0.99
+        nums_new = re.findall(r'\d+/\d+', new_name)
+        nums_old = re.findall(r'\d+/\d+', existing_name)
+        if nums_new and nums_old and nums_new[0] != nums_old[0]:
+            current_score -= 0.5
+        if current_score > best_score:
+            best_score, best_name, best_no = current_score, existing_name, item['number']
+    return best_name, best_score, best_no
+
+@pytest.fixture(scope="module")
+def bc():
+    connector = BusinessCentralConnector()
+    connector.existing_items_cache = [dict(item) for item in CATALOG]
+    assert len(connector.match_index) > MATCH_TOP_K
+    return connector
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_blocked_matches_exhaustive(bc, name):
+    fast = bc.get_match_info(name, exhaustive=False)
+    full = bc.get_match_info(name, exhaustive=True)
+    assert classify_match_score(fast[1]) == classify_match_score(full[1])
+    assert fast[1] == pytest.approx(full[1])
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_index_matches_baseline(bc, name):
+    expected = baseline_match(CATALOG, name)
+    got = bc.get_match_info(name)
+    assert classify_match_score(got[1]) == classify_match_score(expected[1])
+    assert got[1] == pytest.approx(expected[1])
+
+def test_check_match_recall_reports_no_mismatches(bc):
+    assert bc.check_match_recall(QUERIES) == []
+
+def test_batch_reuses_pool_until_index_changes():
+    connector = BusinessCentralConnector()
+    connector.existing_items_cache = [dict(item) for item in CATALOG]
+    names = QUERIES[:40]
+    try:
+        assert connector.get_match_info_batch(names, workers=2) == [connector.get_match_info(n) for n in names]
+        pool = connector._match_pool
+        connector.get_match_info_batch(names, workers=2)
+        assert connector._match_pool is pool
+        connector._add_to_match_index({'displayName': "Aurora Pink Kush 30/1", 'number': "100.9999"})
+        assert connector.get_match_info_batch(["Aurora Pink Kush 30/1"] * 10, workers=2)[0][2] == "100.9999"
+        assert connector._match_pool is not pool
+    finally:
+        connector.close_match_pool()
+    assert connector._match_pool is None
+
+def test_small_batch_keeps_pool():
+    connector = BusinessCentralConnector()
+    connector.existing_items_cache = [dict(item) for item in CATALOG]
+    try:
+        connector.get_match_info_batch(QUERIES[:40], workers=12)
+        pool = connector._match_pool
+        names = QUERIES[:9]   # weniger Namen als Worker
+        assert connector.get_match_info_batch(names, workers=12) == [connector.get_match_info(n) for n in names]
+        assert connector._match_pool is pool
+    finally:
+        connector.close_match_pool()
+
+def test_lazy_match_index_is_built_once(monkeypatch):
+    import connector as connector_module
+    from bc_mirror import CatalogMirror
+    builds = []
+    monkeypatch.setattr(connector_module, "MatchIndex", lambda items: builds.append(1) or MatchIndex(items))
+    connector = BusinessCentralConnector()
+    connector.mirror = CatalogMirror(":memory:")
+    connector.mirror.upsert_items([{'id': item['number'], **item} for item in CATALOG])
+    monkeypatch.setattr(connector, "_sync_items_mirror", lambda force_full=False: ([], False))
+    assert connector.get_match_info(CATALOG[0]['displayName'])[2] == CATALOG[0]['number']
+    assert len(builds) == 1
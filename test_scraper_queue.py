@@ -0,0 +1,159 @@
+import os
+from pathlib import Path
+
+import pytest
+from postgrest.exceptions import APIError
+
+# scraper.py legt beim Import einen Supabase-Client an; die Tests schreiben nie nach Supabase
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test")
+import scraper
+
+MISSING = APIError({"code": "PGRST202", "message": "Could not find the function public.upsert_import_queue(rows) in the schema cache"})
+TIMEOUT = APIError({"code": "57014", "message": "canceling statement due to statement timeout"})
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+    def execute(self):
+        if isinstance(self.data, Exception): raise self.data
+        return self
+
+class Table(Result):
+    """Leere Abfrageergebnisse; upsert() wird mitgeschrieben."""
+    def __init__(self, client):
+        super().__init__([])
+        self.client = client
+    def select(self, *a): return self
+    def in_(self, *a): return self
+    def upsert(self, rows, **kw):
+        self.client.upserts.append(rows)
+        return self
+
+class FakeSupabase:
+    """Antwortet auf rpc() nacheinander mit den übergebenen Fehlern bzw. Ergebnissen."""
+    def __init__(self, *rpc_results):
+        self.rpc_results = list(rpc_results)
+        self.rpc_calls = 0
+        self.upserts = []
+    def rpc(self, name, params):
+        self.rpc_calls += 1
+        return Result(self.rpc_results.pop(0))
+    def table(self, name):
+        return Table(self)
+
+ROWS = [{"product_hash": f"h{i}", "url": f"https://flowzz.com/product/{i}", "status": "READY"} for i in range(3)]
+
+@pytest.fixture(autouse=True)
+def rpc_state(monkeypatch):
+    monkeypatch.setattr(scraper, "_RPC_AVAILABLE", True)
+    monkeypatch.setattr(scraper.time, "sleep", lambda s: None)
+
+def test_transient_rpc_error_is_retried(monkeypatch):
+    fake = FakeSupabase(TIMEOUT, 3)
+    monkeypatch.setattr(scraper, "supabase", fake)
+    assert scraper.write_queue_rows(ROWS) == 3
+    assert fake.rpc_calls == 2 and not fake.upserts
+    assert scraper._RPC_AVAILABLE
+
+def test_persistent_rpc_error_is_raised_and_rpc_stays_enabled(monkeypatch):
+    fake = FakeSupabase(*[TIMEOUT] * scraper.QUEUE_RPC_ATTEMPTS)
+    monkeypatch.setattr(scraper, "supabase", fake)
+    with pytest.raises(APIError):
+        scraper.write_queue_rows(ROWS)
+    assert not fake.upserts
+    assert scraper._RPC_AVAILABLE
+
+def test_missing_rpc_switches_to_fallback(monkeypatch):
+    fake = FakeSupabase(MISSING)
+    monkeypatch.setattr(scraper, "supabase", fake)
+    assert scraper.write_queue_rows(ROWS) == 3
+    assert fake.upserts == [ROWS]
+    assert not scraper._RPC_AVAILABLE
+    # Danach kein RPC-Versuch mehr
+    scraper.write_queue_rows(ROWS)
+    assert fake.rpc_calls == 1
+
+# --- Änderungserkennung ---
+
+FIXTURE = Path(__file__).parent / "test_fixtures" / "detail_full.html"
+URL = "https://flowzz.com/product/detail-full"
+
+class Page:
+    status_code = 200
+    headers = {"ETag": '"v1"'}
+    text = FIXTURE.read_text(encoding="utf-8")
+
+@pytest.fixture
+def page(monkeypatch):
+    monkeypatch.setattr(scraper.SESSION, "get", lambda url, **kw: Page())
+    monkeypatch.setattr(scraper, "CHECK_IMAGES", False)
+    monkeypatch.setattr(scraper, "download_image", lambda *a, **kw: None)
+    daten = scraper.baue_daten(URL, scraper.felder_aus_rohdaten(scraper.rohdaten_aus_html(Page.text, URL)), bild=False)
+    return scraper.apply_pre_cleaning(daten)
+
+def stored_before_resolver(daten):
+    # So liegen ältere Einträge in der Queue: ohne 'Hersteller Code'
+    return {k: v for k, v in daten.items() if k != 'Hersteller Code'}
+
+def test_row_without_fingerprint_becomes_baseline(page):
+    old = stored_before_resolver(page)
+    del old['_fingerprint']
+    state, fp, diff = scraper.check_for_changes(URL, old)
+    assert state == scraper.CHANGE_BASELINE and diff == {}
+    assert fp['content_hash'] == page['_fingerprint']['content_hash'] and fp['etag'] == '"v1"'
+
+def test_derived_fields_are_not_a_change(page):
+    old = stored_before_resolver(page)
+    old['_fingerprint'] = {'content_hash': "hash-aus-altem-schema"}
+    assert scraper.diff_scraped(old, page) == {}
+    assert scraper.check_for_changes(URL, old)[0] == scraper.CHANGE_NONE
+
+def test_real_change_is_reported_with_diff(page):
+    old = stored_before_resolver(page)
+    old['THC'] = "18"
+    old['_fingerprint'] = {'content_hash': scraper.create_content_hash(old)}
+    state, daten, diff = scraper.check_for_changes(URL, old)
+    assert state == scraper.CHANGE_FOUND
+    assert diff == {'THC': ["18", "22"]}
+    assert daten['_changes']['fields'] == diff
+
+def test_content_hash_ignores_derived_fields(page):
+    assert scraper.create_content_hash(page) == scraper.create_content_hash(stored_before_resolver(page))
+
+# --- CHECKPOINT AM LAUFENDE ---
+
+class FakeBC:
+    def authenticate(self): pass
+    def close_match_pool(self): pass
+
+class LateFlushWriter(scraper.QueueWriter):
+    """Simuliert einen Timer-Flush, der erst während close() fertig wird."""
+    def close(self):
+        super().close()
+        self.on_flush([{'url': "https://flowzz.com/product/spaet"}])
+
+def run_scraper(monkeypatch, tmp_path, crawl):
+    from crawl_checkpoint import CrawlCheckpoint
+    path = str(tmp_path / "checkpoint.json")
+    monkeypatch.setattr(scraper, "BusinessCentralConnector", FakeBC)
+    monkeypatch.setattr(scraper, "CrawlCheckpoint", lambda: CrawlCheckpoint(path))
+    monkeypatch.setattr(scraper, "QueueWriter", lambda on_flush: LateFlushWriter(on_flush=on_flush))
+    monkeypatch.setattr(scraper, "crawl_catalog", crawl)
+    monkeypatch.setattr(scraper, "fetch_known_urls", lambda links: {})
+    monkeypatch.setattr(scraper, "CHANGE_DETECTION", False)
+    monkeypatch.setattr(scraper, "match_and_sync", lambda *a, **kw: None)
+    scraper.run_nightly_scraper()
+    return Path(path)
+
+def test_finished_run_clears_checkpoint_after_last_flush(monkeypatch, tmp_path):
+    def crawl(checkpoint):
+        checkpoint.mark_crawl_finished()
+        return []
+    assert not run_scraper(monkeypatch, tmp_path, crawl).exists()
+
+def test_aborted_run_keeps_checkpoint(monkeypatch, tmp_path):
+    def crawl(checkpoint):
+        checkpoint.mark_crawl_finished()
+        raise RuntimeError("Browser abgestürzt")
+    assert run_scraper(monkeypatch, tmp_path, crawl).exists()
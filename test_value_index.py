@@ -0,0 +1,89 @@
+import random
+import re
+
+import pytest
+
+from connector import ValueIndex
+
+# ==========================================
+# REFERENZ: BISHERIGER LINEARER SCAN
+# ==========================================
+# Unveränderte Schleifen aus dem alten _ensure_value_exists (erster Treffer in Cache-Reihenfolge).
+
+def baseline_find(values, clean_val, brand):
+    if brand:
+        ignore_words = ["gmbh", "ag", "limited", "ltd", "pharma", "pharm", "medical", "cannabis", "deutschland", "germany", "europe", "healthcare", "therapeutics", "labs"]
+        def normalize_brand(name):
+            n = name.lower()
+            for word in ignore_words: n = n.replace(word, "")
+            return re.sub(r'[^a-z0-9]', '', n)
+        input_core = normalize_brand(clean_val)
+        for existing_name, existing_id in values.items():
+            bc_core = normalize_brand(existing_name)
+            if input_core == bc_core: return existing_id
+            if len(input_core) > 2 and len(bc_core) > 2 and (input_core in bc_core or bc_core in input_core):
+                return existing_id
+        return None
+    search_key_strict = clean_val.lower().strip()
+    for existing_name, existing_id in values.items():
+        if existing_name.lower().strip() == search_key_strict: return existing_id
+    return None
+
+# ==========================================
+# FIXTURES
+# ==========================================
+
+HERSTELLER = ["Aurora Deutschland GmbH", "Aurora", "Bedrocan", "Four 20 Pharma", "420 Pharma", "Canopy Growth",
+              "Canopy Medical", "Tilray", "Remexian Pharma", "Cannamedical", "IMC", "AG", "Ab", "ENUA Pharma",
+              "Demecan", "Pharmcann", "MediCann", "MeCann", "Can", "Labs GmbH"]
+ANFRAGEN = ["aurora", "AURORA DEUTSCHLAND", "Aurora Cannabis", "Four20", "four 20", "canopy", "Canopy Growth Corp",
+            "tilray medical", "Remexian", "remex", "Cannamedical Pharma GmbH", "imc", "IMC Germany", "ag", "ab", "",
+            "enua", "mecann", "medicann", "Pharma", "Can", "cann", "xyz", "Demecan GmbH", "Bedrocan Sativa"]
+
+SILBEN = ["can", "med", "aur", "ora", "pha", "rma", "x", "ab", "til", "ray", "1", "20", "ic", "a"]
+FUELL  = ["", " GmbH", " Pharma", " Medical", " Labs", " AG", " Deutschland", "-", " & Co."]
+
+def zufallsname(rng):
+    kern = "".join(rng.choice(SILBEN) for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.3: kern = kern.upper()
+    elif rng.random() < 0.5: kern = kern.capitalize()
+    return kern + rng.choice(FUELL)
+
+def values_of(names):
+    return {name: f"id-{i}" for i, name in enumerate(names)}
+
+# ==========================================
+# TESTS
+# ==========================================
+
+@pytest.mark.parametrize("query", ANFRAGEN)
+def test_brand_lookup_matches_linear_scan(query):
+    values = values_of(HERSTELLER)
+    assert ValueIndex(values, brand=True).find(query) == baseline_find(values, query, brand=True)
+
+@pytest.mark.parametrize("query", ["Bestrahlt", "bestrahlt ", "Unbestrahlt", "Bestrahl", "", "Indica dominant"])
+def test_exact_lookup_matches_linear_scan(query):
+    values = values_of(["Bestrahlt", "BESTRAHLT", "Unbestrahlt", " Indica dominant ", "Hybrid"])
+    assert ValueIndex(values).find(query) == baseline_find(values, query, brand=False)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_randomized_against_linear_scan(seed):
+    rng = random.Random(seed)
+    values = values_of(dict.fromkeys(zufallsname(rng) for _ in range(rng.randint(1, 60))))
+    queries = [zufallsname(rng) for _ in range(100)] + list(values)
+    for brand in (True, False):
+        index = ValueIndex(values, brand=brand)
+        for query in queries:
+            assert index.find(query) == baseline_find(values, query, brand), (brand, query)
+
+def test_added_values_keep_cache_order():
+    # Neu angelegte Werte hängen hinten an, wie im alten Cache-Dict
+    rng = random.Random(99)
+    names = list(dict.fromkeys(zufallsname(rng) for _ in range(80)))
+    index = ValueIndex(values_of(names[:40]), brand=True)
+    values = values_of(names[:40])
+    for i, name in enumerate(names[40:], start=40):
+        index.add(name, f"id-{i}")
+        values[name] = f"id-{i}"
+        for query in names[::5] + ["canmed", "aurora", "x"]:
+            assert index.find(query) == baseline_find(values, query, brand=True), query